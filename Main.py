@@ -1,14 +1,18 @@
 import sys
 import threading
 from pathlib import Path
-from time import sleep
-
-import cv2
-import yaml
-from PIL import ExifTags, Image, ImageOps
-import tornado
-from PyQt5.QtCore import Qt, pyqtSignal
-from PyQt5.QtGui import QPixmap, QImage
+
+FILE = Path(__file__).resolve()
+path = FILE.parents[0]
+if str(path / 'yolov5') not in sys.path:
+    sys.path.append(str(path / 'yolov5'))  # yolov5 utils, as detect.py adds it
+
+from utils.startup import StartupProfiler
+
+startup = StartupProfiler(enabled='--profile-startup' in sys.argv)  # before the imports it times
+
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtGui import QPixmap
 from PyQt5.QtWidgets import QMessageBox
 
 from mainFrame import Ui_MainWindow as mainWindow
@@ -16,12 +20,79 @@ from uitest import Ui_MainWindow as picWindow
 from uitest2 import Ui_MainWindow as videoWindow
 from uitest3 import Ui_MainWindow as setWindow
 from PyQt5 import QtWidgets, QtCore
-import torch
 import os
-from yolov5 import detect
+from utils.control import DetectControl
+from utils.qt import show_frame
+
+startup.mark('imports')
+
 
-FILE = Path(__file__).resolve()
-path = FILE.parents[0]
+
+def get_session():
+    # Shared detector for all windows, the model is loaded on first use and then stays warm. torch and the model
+    # code are imported here rather than at startup, a call while the background load is running waits for it
+    from yolov5 import detect
+    return detect.load_session(weights=path / "best.pt", data=path / "yolov5/data/waste.yaml")
+
+
+class ModelLoader(QThread):
+    # Loads the shared detector in the background once the main window is up
+    loaded = pyqtSignal(str)  # error message, empty on success
+
+    def run(self):
+        try:
+            get_session()
+            self.loaded.emit('')
+        except Exception as e:
+            self.loaded.emit(str(e))
+
+
+class DetectWorker(QThread):
+    # Runs camera inference off the GUI thread, only the latest annotated frame is handed to the GUI for painting
+    frameReady = pyqtSignal()  # a new latest frame is waiting in self.latest()
+    textReady = pyqtSignal(str)  # waste-category summary
+    failed = pyqtSignal(str)  # error message, the loop has stopped
+
+    def __init__(self, control, source=0):
+        QThread.__init__(self)
+        self.control = control
+        self.source = source
+        self._lock = threading.Lock()
+        self._frame = None
+        self._pending = False  # frameReady emitted but not yet consumed by the GUI
+
+    def run(self):
+        try:
+            get_session().predict(self.source, control=self.control, on_frame=self.putFrame,
+                                  on_text=self.textReady.emit)
+        except Exception as e:  # i.e. missing weights or camera, raised on this thread so the GUI is told here
+            self.failed.emit(str(e) or type(e).__name__)
+
+    def putFrame(self, im0):
+        # Called on the worker thread, replaces any frame the GUI has not painted yet
+        with self._lock:
+            self._frame = im0
+            pending, self._pending = self._pending, True
+        if not pending:
+            self.frameReady.emit()
+
+    def latest(self):
+        # Called on the GUI thread, returns the newest frame (or None)
+        with self._lock:
+            im0, self._frame, self._pending = self._frame, None, False
+        return im0
+
+
+def showError(parent, e):
+    msg_box = QMessageBox(QMessageBox.Warning, 'Warning', e, parent=parent)
+    msg_box.exec_()
+
+
+def modelLoaded(parent, e):
+    startup.mark('model loaded' if not e else 'model load failed')
+    startup.report()
+    if e:
+        showError(parent, f"模型加载失败: {e}")
 
 
 class MainWindow(QtWidgets.QMainWindow):
@@ -65,7 +136,7 @@ class PicWindow(QtWidgets.QMainWindow):
                 msg_box = QMessageBox(QMessageBox.Warning, 'Warning', "请暂时不要使用中文路径")
                 msg_box.exec_()
                 return
-        path1 = detect.run(weights=path / "best.pt", source=self.filename_chosen, show_text=self.ui.label_2)
+        path1 = get_session().predict(self.filename_chosen, show_text=self.ui.label_2)
         width = self.ui.pic2.width()
         height = self.ui.pic2.height()
         img = QPixmap()
@@ -85,24 +156,25 @@ class VidWindow(QtWidgets.QMainWindow):
         self.cap = None
         with open(path / 'yolov5/save_path.txt', 'r')as file:
             self.save_path = file.read().strip()
-        file1 = open(path / "yolov5/global.txt", 'w')
-        file1.write('2')
-        file1.close()
+        self.control = DetectControl(save_path=self.save_path)  # in-memory stop/pause/snapshot channel
+        self.worker = None
+        self.frame_shape = None  # (h, w) of the last painted frame
+        self.origin = None  # ROI drag start on pic1
+        self.rubber = QtWidgets.QRubberBand(QtWidgets.QRubberBand.Rectangle, self.ui.pic1)
+        self.ui.pic1.installEventFilter(self)
 
     def getFromCamera(self):
+        if self.worker and self.worker.isRunning():  # camera loop already started, resume it
+            self.control.resume()
+            return
         try:  # test for camera
+            import cv2
             self.cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)  # 0第一个摄像头
             self.cap = None
         except:
             msg_box = QMessageBox(QMessageBox.Warning, 'Warning', "未检测出摄像头！")
             msg_box.exec_()
             return
-        with open(path / 'yolov5/save_path.txt', 'r')as file:
-            self.save_path = file.read().strip()
-            file.close()
-        with open(path / "yolov5/global.txt", 'r')as file:
-            flag = file.read().strip()
-            file.close()
         # while 1:
         #     ret, frame = self.cap.read()
         #     frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -112,30 +184,71 @@ class VidWindow(QtWidgets.QMainWindow):
         #     img = img.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
         #     self.ui.pic1.setPixmap(img)
         #     cv2.waitKey(1)
-        if flag == '2':
-            detect.run(source=0, weights=path / "best.pt", show_camera=self.ui.pic1, show_text=self.ui.label_2, my_save_path=self.save_path)
+        self.control.reset()  # new run, before the worker starts so a stop() from here on is kept
+        self.worker = DetectWorker(self.control, source=0)
+        self.worker.frameReady.connect(self.showFrame)
+        self.worker.textReady.connect(self.ui.label_2.setText)
+        self.worker.failed.connect(lambda e: showError(self, e))
+        self.worker.start()
+
+    def showFrame(self):
+        im0 = self.worker.latest()  # None if this frame was already painted
+        if im0 is not None:
+            self.frame_shape = im0.shape[:2]
+            show_frame(self.ui.pic1, im0)
+
+    def eventFilter(self, obj, event):
+        # Drag on the video to add a detection region of interest, right-click to clear them (whole frame again)
+        if obj is self.ui.pic1:
+            t = event.type()
+            if t == QtCore.QEvent.MouseButtonPress and event.button() == Qt.LeftButton:
+                self.origin = event.pos()
+                self.rubber.setGeometry(QtCore.QRect(self.origin, QtCore.QSize()))
+                self.rubber.show()
+            elif t == QtCore.QEvent.MouseMove and self.origin is not None:
+                self.rubber.setGeometry(QtCore.QRect(self.origin, event.pos()).normalized())
+            elif t == QtCore.QEvent.MouseButtonRelease and self.origin is not None:
+                self.rubber.hide()
+                roi = self.toFrame(QtCore.QRect(self.origin, event.pos()).normalized())
+                self.origin = None
+                if roi:
+                    self.control.add_roi(roi)
+            elif t == QtCore.QEvent.MouseButtonPress and event.button() == Qt.RightButton:
+                self.control.clear_rois()
+        return QtWidgets.QMainWindow.eventFilter(self, obj, event)
+
+    def toFrame(self, rect):
+        # pic1 widget rect to frame pixels [x1, y1, x2, y2], None before the first frame
+        label, pixmap = self.ui.pic1, self.ui.pic1.pixmap()
+        if pixmap is None or pixmap.isNull() or self.frame_shape is None:
+            return None
+        shown = QtWidgets.QStyle.alignedRect(label.layoutDirection(), label.alignment(), pixmap.size(),
+                                             label.contentsRect())  # where the scaled frame is painted
+        g = self.frame_shape[1] / shown.width()
+        return [(rect.left() - shown.left()) * g, (rect.top() - shown.top()) * g,
+                (rect.right() - shown.left()) * g, (rect.bottom() - shown.top()) * g]
 
     def changeFlag(self):
-        with open(path / "yolov5/global.txt", 'w')as file1:file1.write('0')
+        self.control.pause()
 
     def ex(self):
-        with open(path / "yolov5/global.txt", 'w')as file1:file1.write('2')
-        with open(path / "yolov5/save.txt", 'w+')as file1:file1.write('0')
+        self.control.stop()
+        self.control.set_snapshot(False)
+
+    def shutdown(self):
+        self.ex()
+        if self.worker:
+            self.worker.wait()
+
+    def setSavePath(self, save_path):
+        self.save_path = save_path
+        self.control.set_save_path(save_path)
 
     def getCurrentPic(self):
-        with open(path / 'yolov5/save_path.txt', 'r')as file:
-            self.save_path = file.read().strip()
-            file.close()
-        with open(path / "yolov5/save.txt", 'r')as file1:
-            temp = file1.read().strip()
-            if temp == '0':
-                self.ui.pushButton_2.setText("停止截取画面")
-            else:
-                self.ui.pushButton_2.setText("截取当前画面")
-            file1.close()
-        with open(path / "yolov5/save.txt", 'w')as file1:
-            file1.write(str(1-int(temp)))
-            file1.close()
+        if self.control.toggle_snapshot():
+            self.ui.pushButton_2.setText("停止截取画面")
+        else:
+            self.ui.pushButton_2.setText("截取当前画面")
 
 
 class SetWindow(QtWidgets.QMainWindow):
@@ -163,7 +276,12 @@ class SetWindow(QtWidgets.QMainWindow):
 
 
 if __name__ == "__main__":
-    app = QtWidgets.QApplication(sys.argv)
+    app = QtWidgets.QApplication([x for x in sys.argv if x != '--profile-startup'])
+    splash = QtWidgets.QSplashScreen(QPixmap(360, 120))
+    splash.showMessage("正在启动...", Qt.AlignCenter, Qt.white)
+    splash.show()
+    app.processEvents()
+    startup.mark('splash shown')
     mw = MainWindow()
     pw = PicWindow()
     vw = VidWindow()
@@ -182,11 +300,19 @@ if __name__ == "__main__":
     vw.ui.pushButton_3.clicked.connect(vw.hide)
     vw.ui.pushButton_3.clicked.connect(mw.show)
     vw.ui.pushButton_3.clicked.connect(vw.changeFlag)
+    sw.ui.pushButton.clicked.connect(lambda: vw.setSavePath(sw.save_path))
     sw.ui.pushButton.clicked.connect(sw.hide)
     sw.ui.pushButton.clicked.connect(mw.show)
     sw.ui.pushButton_2.clicked.connect(sw.hide)
     sw.ui.pushButton_2.clicked.connect(mw.show)
 
 
+    app.aboutToQuit.connect(vw.shutdown)
+
     mw.show()
+    splash.finish(mw)
+    startup.mark('main window shown')
+    loader = ModelLoader()  # model import and load after the window is up
+    loader.loaded.connect(lambda e: modelLoaded(mw, e))
+    loader.start()
     sys.exit(app.exec_())
@@ -27,14 +27,14 @@ Usage - formats:
 import argparse
 import os
 import sys
+import threading
+import time
 from pathlib import Path
-from time import sleep
 
 import cv2
+import numpy as np
 import torch
 import torch.backends.cudnn as cudnn
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QPixmap, QImage
 
 FILE = Path(__file__).resolve()
 ROOT = FILE.parents[0]  # YOLOv5 root directory
@@ -44,13 +44,97 @@ if str(ROOT) not in sys.path:
 # ROOT = Path(os.path.relpath(ROOT, Path.cwd()))  # relative
 
 from models.common import DetectMultiBackend
-from utils.datasets import IMG_FORMATS, VID_FORMATS, LoadImages, LoadStreams
+from utils.augmentations import letterbox
+from utils.categories import ClassMeta
+from utils.control import DetectControl
+from utils.datasets import IMG_FORMATS, VID_FORMATS, LoadImages, LoadStreamProcesses, LoadStreams
 from utils.general import (LOGGER, check_file, check_img_size, check_imshow, check_requirements, colorstr,
-                           increment_path, non_max_suppression, print_args, scale_coords, strip_optimizer, xyxy2xywh)
+                           increment_path, non_max_suppression, print_args, scale_coords, strip_optimizer)
 from utils.plots import Annotator, colors, save_one_box
+from utils.preprocess import Letterbox, Preprocessor
 from utils.torch_utils import select_device, time_sync
 
 
+class DetectorSession:
+    # YOLOv5 persistent detector, loads and warms up a model once for repeated run() / predict() calls
+    def __init__(self, weights=ROOT / 'yolov5s.pt', device='', half=False, dnn=False, data=ROOT / 'data/coco128.yaml'):
+        self.device = select_device(device)
+        self.model = DetectMultiBackend(weights, device=self.device, dnn=dnn, data=data, fp16=half)
+        self.weights, self.data, self.half, self.dnn = weights, data, half, dnn
+        self.stride, self.names, self.pt = self.model.stride, self.model.names, self.model.pt
+        self.meta = ClassMeta.from_yaml(self.names, data)  # class metadata table, i.e. waste categories
+        self.lock = threading.Lock()  # serialise forward passes from GUI, REST and worker threads
+        self.warm = set()  # input shapes already warmed up
+        self.pool, self.pool_key = None, None  # WorkerPool of model replicas, kept across run() calls
+
+    def warmup(self, imgsz=(640, 640), bs=1):
+        # Warmup model once per input shape
+        shape = (1 if self.pt else bs, 3, *imgsz)
+        if shape not in self.warm:
+            with self.lock:
+                self.model.warmup(imgsz=shape)
+            self.warm.add(shape)
+
+    def worker_pool(self, workers, threads=0, affinity=False, **infer_kwargs):
+        # Return a WorkerPool of this model, restarted only when its settings change or a worker died
+        key = (workers, threads, affinity, repr(sorted(infer_kwargs.items())))
+        if self.pool and (self.pool_key != key or self.pool.broken):
+            self.pool.close()
+            self.pool = None
+        if not self.pool:
+            from utils.workers import WorkerPool  # not needed in worker and capture processes or in-process runs
+            self.pool = WorkerPool(self.weights, workers, threads, affinity, device=self.device, half=self.half,
+                                   dnn=self.dnn, data=self.data, **infer_kwargs)
+            self.pool_key = key
+        return self.pool
+
+    def close(self):
+        # Stop the worker pool, if any, and free its shared memory
+        if self.pool:
+            self.pool.close()
+            self.pool = None
+
+    def predict(self, source, **kwargs):
+        # Usage:
+        #   file/dir/URL/glob/stream:   session.predict('img.jpg', show_text=label)  # detect.run(), returns save path
+        #   numpy BGR image(s):         session.predict(cv2.imread('img.jpg'))  # returns list of (n,6) detections
+        if isinstance(source, (np.ndarray, list)):
+            return self.infer(source, **kwargs)
+        return run(source=source, session=self, **kwargs)
+
+    @torch.no_grad()
+    def infer(self, ims, imgsz=(640, 640), conf_thres=0.25, iou_thres=0.45, classes=None, agnostic_nms=False,
+              max_det=1000, augment=False):
+        # In-memory inference on BGR numpy image(s), returns list of (n,6) tensors [xyxy, conf, cls] in image pixels
+        ims = ims if isinstance(ims, list) else [ims]
+        imgsz = check_img_size(list(imgsz), s=self.stride)
+        im = np.stack([letterbox(x, imgsz, stride=self.stride, auto=False)[0] for x in ims], 0)  # equal shapes
+        im = np.ascontiguousarray(im[..., ::-1].transpose((0, 3, 1, 2)))  # BGR to RGB, BHWC to BCHW
+        im = torch.from_numpy(im).to(self.device)
+        im = im.half() if self.model.fp16 else im.float()  # uint8 to fp16/32
+        im /= 255  # 0 - 255 to 0.0 - 1.0
+        self.warmup(imgsz, bs=len(ims))
+        with self.lock:
+            pred = self.model(im, augment=augment)
+        pred = non_max_suppression(pred, conf_thres, iou_thres, classes, agnostic_nms, max_det=max_det)
+        for x, det in zip(ims, pred):
+            det[:, :4] = scale_coords(im.shape[2:], det[:, :4], x.shape).round()
+        return pred
+
+
+SESSIONS = {}  # model registry {(weights, device, half, dnn, data): DetectorSession}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def load_session(weights=ROOT / 'yolov5s.pt', device='', half=False, dnn=False, data=ROOT / 'data/coco128.yaml'):
+    # Return the cached DetectorSession for these settings, loading the model on first use only
+    key = (str(weights), str(device), half, dnn, str(data))
+    with _SESSIONS_LOCK:
+        if key not in SESSIONS:
+            SESSIONS[key] = DetectorSession(weights, device=device, half=half, dnn=dnn, data=data)
+        return SESSIONS[key]
+
+
 @torch.no_grad()
 def run(save_path=None,    # !!!!!
         show_camera=None,    # !!!!!
@@ -63,9 +147,27 @@ def run(save_path=None,    # !!!!!
         conf_thres=0.25,  # confidence threshold
         iou_thres=0.45,  # NMS IOU threshold
         max_det=1000,  # maximum detections per image
+        batch_size=1,  # images per forward pass for image files/dirs/globs, grouped by letterboxed shape
+        prefetch=0,  # image files decoded and letterboxed ahead on a thread pool, 0 to read in-line
+        vid_stride=1,  # analyse every vid_stride-th video frame, skipped frames are grabbed but not decoded
+        vid_latest=False,  # play video files back in real time and analyse only the newest decoded frame
+        fused_preprocess=False,  # letterbox, BGR to RGB, HWC to CHW and /255 in one torch pass on the model device
+        reuse_buffers=False,  # letterbox video/stream frames into persistent buffers with cached geometry
+        rt_fps=0,  # real-time scheduler target inference FPS, other frames reuse the last detections, 0 for all frames
+        rt_latency=0,  # real-time scheduler max capture-to-display latency (ms), older frames are dropped, 0 for none
+        motion_gate=0,  # skip inference unless this fraction of pixels changed since the last inferred frame, 0 off
+        motion_refresh=30,  # motion gate forced inference interval (frames)
+        track=False,  # SORT tracker after NMS, boxes get track ids and are propagated between detector keyframes
+        track_every=1,  # run the detector every Nth frame (or when tracks become uncertain), track in between
+        tile=0,  # sliced inference tile size (pixels), 0 to letterbox whole images to imgsz
+        tile_overlap=0.2,  # tile overlap fraction
+        tile_full=False,  # also run the letterboxed full image and merge it with the tiles
+        tile_batch=8,  # max tiles per forward pass, bounds memory
+        rois=None,  # regions of interest [[x1, y1, x2, y2], ...] in frame pixels, runtime-settable through control
         device='',  # cuda device, i.e. 0 or 0,1,2,3 or cpu
         view_img=False,  # show results
         save_txt=False,  # save results to *.txt
+        save_txt_single=False,  # save all --save-txt labels to one labels.txt, led by source stem and frame columns
         save_conf=False,  # save confidences in --save-txt labels
         save_crop=False,  # save cropped prediction boxes
         nosave=False,  # do not save images/videos
@@ -81,13 +183,36 @@ def run(save_path=None,    # !!!!!
         hide_labels=False,  # hide labels
         hide_conf=False,  # hide confidences
         half=False,  # use FP16 half-precision inference
-        dnn=False  # use OpenCV DNN for ONNX inference
+        dnn=False,  # use OpenCV DNN for ONNX inference
+        session=None,  # DetectorSession to reuse, default cached load_session(weights, device, half, dnn, data)
+        control=None,  # DetectControl for stop/pause/snapshot/save-path, default DetectControl(my_save_path)
+        on_frame=None,  # callable(im0) receiving each annotated BGR frame, i.e. a GUI worker signal
+        on_text=None,  # callable(str) receiving the waste-category summary, default show_text.setText
+        pipeline=False,  # run capture/preprocess/infer/NMS/annotate as threaded stages connected by bounded queues
+        pipeline_workers=(1, 1, 1, 1),  # worker threads per stage: preprocess, infer (always 1), NMS, annotate
+        stream_processes=False,  # capture each stream in its own process, frames handed over in shared memory
+        cpu_workers=0,  # model replicas in worker processes, each frame inferred whole by one of them, 0 in-process
+        cpu_threads=0,  # torch threads per worker process, 0 to split the available cores
+        cpu_affinity=False,  # pin each worker process to its own cores (Linux)
+        pipeline_queue=4,  # max items queued between stages
+        pipeline_policy='block',  # full-queue policy: 'block' or 'drop' (drop-oldest)
+        save_workers=2,  # image/snapshot/crop writer threads
+        save_queue=16,  # max images queued for writing
+        save_policy=None,  # full writer queue policy: 'block' or 'drop', default 'drop' for streams else 'block'
+        vid_queue=32,  # max frames queued per video sink
+        vid_scale=1.0,  # save videos downscaled by this factor
+        vid_det_only=False,  # save only video frames with detections
+        offline=False,  # skip network and environment checks and downloads, as YOLOv5_OFFLINE=true
         ):
+    if offline:
+        os.environ['YOLOv5_OFFLINE'] = 'true'  # inherited by worker and capture processes
+    from utils.pipeline import Pipeline  # run() helpers, imported here to keep `import detect` light
+    from utils.scheduler import DROP, INFER, TRACK
+    from utils.sinks import ImageWriter, VideoSink, label_rows
+    from utils.tiles import Tiler, clip_rois, merge
     my_count = 0
-    if my_save_path:
-        with open(ROOT / 'global.txt', 'w')as file:
-            file.write('1')
-            file.close()
+    control = control or DetectControl(save_path=my_save_path)
+    on_text = on_text or (show_text.setText if show_text else None)
 
     source = str(source)
     save_img = not nosave and not source.endswith('.txt')  # save inference images
@@ -99,234 +224,373 @@ def run(save_path=None,    # !!!!!
 
     # Directories
     save_dir = increment_path(Path(project) / name, exist_ok=exist_ok)  # increment run
+    save_txt = save_txt or save_txt_single
     (save_dir / 'labels' if save_txt else save_dir).mkdir(parents=True, exist_ok=True)  # make dir
 
     # Load model
-    device = select_device(device)
-    model = DetectMultiBackend(weights, device=device, dnn=dnn, data=data, fp16=half)
+    session = session or load_session(weights, device=device, half=half, dnn=dnn, data=data)
+    model, device = session.model, session.device
     stride, names, pt = model.stride, model.names, model.pt
+    meta = session.meta  # class metadata for the waste-category summary
     imgsz = check_img_size(imgsz, s=stride)  # check image size
 
     # Dataloader
+    w = tuple(pipeline_workers) + (1,) * (4 - len(pipeline_workers))  # workers per stage
+    if track:
+        w = w[:2] + (1,) + w[3:]  # trackers are updated in capture order on a single NMS worker
+    pool = session.worker_pool(cpu_workers, cpu_threads, cpu_affinity, imgsz=imgsz, conf_thres=conf_thres,
+                               iou_thres=iou_thres, classes=classes, agnostic_nms=agnostic_nms, max_det=max_det,
+                               augment=augment) if cpu_workers else None
+    pipeline = pipeline or bool(pool)  # frames in flight on all workers at once
+    nbuf = w[0] + pipeline_queue + 2 if pipeline else 1  # loader/preprocess outputs that can be in flight
+    reuse = nbuf if reuse_buffers else 0
     if webcam:
-        view_img = check_imshow()
+        view_img = bool(on_frame or show_camera) or check_imshow()
         cudnn.benchmark = True  # set True to speed up constant image size inference
-        dataset = LoadStreams(source, img_size=imgsz, stride=stride, auto=pt)
+        if stream_processes:  # frames are views into shared memory until annotate() copies them
+            hold = 4 * (pipeline_queue + max(w)) + 2 if pipeline else 2
+            dataset = LoadStreamProcesses(source, img_size=imgsz, stride=stride, auto=pt, raw=fused_preprocess,
+                                          reuse_buffers=reuse, hold=hold)
+        else:
+            dataset = LoadStreams(source, img_size=imgsz, stride=stride, auto=pt, raw=fused_preprocess,
+                                  reuse_buffers=reuse)
         bs = len(dataset)  # batch_size
     else:
-        dataset = LoadImages(source, img_size=imgsz, stride=stride, auto=pt)
-        bs = 1  # batch_size
+        dataset = LoadImages(source, img_size=imgsz, stride=stride, auto=pt, batch_size=batch_size, prefetch=prefetch,
+                             vid_stride=vid_stride, vid_latest=vid_latest, raw=fused_preprocess, reuse_buffers=reuse)
+        bs = dataset.batch_size  # batch_size
     vid_path, vid_writer = [None] * bs, [None] * bs
+    save_policy = save_policy or ('drop' if webcam else 'block')
+    writer = ImageWriter(save_workers, save_queue, save_policy)  # async imwrite
 
     # Run inference
-    model.warmup(imgsz=(1 if pt else bs, 3, *imgsz))  # warmup
-    dt, seen = [0.0, 0.0, 0.0], 0
-    for path, im, im0s, vid_cap, s in dataset:
-        ttt = '0'   # 0hidden, 1running, 2exit
-
-        t1 = time_sync()
-        im = torch.from_numpy(im).to(device)
-        im = im.half() if model.fp16 else im.float()  # uint8 to fp16/32
-        im /= 255  # 0 - 255 to 0.0 - 1.0
-        if len(im.shape) == 3:
-            im = im[None]  # expand for batch dim
-        t2 = time_sync()
-        dt[0] += t2 - t1
+    session.warmup(imgsz, bs=bs)  # warmup (once per session and shape)
+    if rt_fps or rt_latency or motion_gate:
+        from utils.scheduler import FrameScheduler, MotionGate
+    if track:
+        from utils.tracker import Sort
+    sched = FrameScheduler(rt_fps, rt_latency / 1E3) if rt_fps or rt_latency else None  # real-time scheduler
+    gate = MotionGate(motion_gate, motion_refresh) if motion_gate else None  # static-scene inference gate
+    last_det = {}  # last detections per stream in image pixels, for frames the scheduler or gate reuses them on
+    trackers = {} if track else None  # {stream index: Sort}
+    tiler = Tiler(check_img_size(tile, s=stride), tile_overlap) if tile else None  # sliced inference
+    roi_rect = Letterbox(imgsz, stride, auto=pt, buffers=nbuf)  # single ROI, minimum rectangle
+    roi_square = Letterbox(imgsz, stride, auto=False, buffers=nbuf)  # several ROIs batched at one shape
+    if rois:
+        control.set_rois(rois)
+    track_ids = {}  # {stream index: {class: track ids seen}}, distinct objects for the waste-category summary
+
+    def capture():
+        # Capture stage, snapshot per-item loader state before the loader moves on
+        for index, (path, im, im0s, vid_cap, s) in enumerate(dataset):
+            frame = dataset.count if webcam else getattr(dataset, 'frame', 0)
+            yield {'path': path, 'im': im, 'im0s': im0s, 'vid_cap': vid_cap, 's': s, 'mode': dataset.mode,
+                   'frame': frame, 'index': index, 't0': time.time(), 'action': INFER}
+            if control.stopped:  # stalled streams return within LoadStreams.stall, so stop is seen while waiting
+                break
+
+    prep = Preprocessor(imgsz, stride, auto=pt and getattr(dataset, 'rect', True), device=device, half=model.fp16,
+                        buffers=nbuf) if fused_preprocess else None
+
+    @torch.no_grad()  # grad mode is thread-local, stages may run on pipeline workers
+    def preprocess(x):
+        if pool:  # workers letterbox the original frames themselves
+            x['im'] = x['im'][None] if x['im'].ndim == 3 else x['im']  # for the shape in the log line only
+            return x
+        if tiler:  # uint8 tiles per image, converted in tile_batch chunks at inference
+            x['tiles'] = [tiler(im0) for im0 in (x['im0s'] if isinstance(x['im0s'], list) else [x['im0s']])]
+        if prep:  # raw frames, fused on-device letterbox
+            x['im'] = prep(x['im0s'])
+        else:
+            im = torch.from_numpy(x['im']).to(device)
+            im = im.half() if model.fp16 else im.float()  # uint8 to fp16/32
+            im /= 255  # 0 - 255 to 0.0 - 1.0
+            if len(im.shape) == 3:
+                im = im[None]  # expand for batch dim
+            x['im'] = im
+        if not tiler:
+            crop_rois(x)
+        return x
+
+    def tile_input(tiles):
+        im = torch.from_numpy(tiles).to(device)
+        return (im.half() if model.fp16 else im.float()) / 255
+
+    def crop_rois(x):
+        # Letterboxed ROI crops (input, crop offsets, crop shapes) per image, the whole frame for images without ROIs.
+        # ROIs are read from control per frame so the GUI can change them while running
+        im0s = x['im0s'] if isinstance(x['im0s'], list) else [x['im0s']]
+        x['rois'] = [clip_rois(control.rois(i), im0.shape) for i, im0 in enumerate(im0s)]
+        x['regions'] = [] if any(x['rois']) else None
+        for i, (r, im0) in enumerate(zip(x['rois'], im0s) if any(x['rois']) else ()):
+            if r:
+                crops = [im0[y1:y2, x1:x2] for x1, y1, x2, y2 in r]
+                im = tile_input((roi_rect if len(crops) == 1 else roi_square).batch(crops))
+                x['regions'].append((im, [b[:2] for b in r], [c.shape for c in crops]))
+            else:
+                x['regions'].append((x['im'][i:i + 1], [(0, 0)], [im0.shape]))
+
+    @torch.no_grad()
+    def infer(x):
+        if sched:  # decide as late as possible, frames may have queued since capture
+            x['action'], x['t_decide'] = sched.decide(x['t0'], can_reuse=bool(last_det)), time.time()
+            if x['action'] == DROP:
+                return None
+        if gate and x['action'] == INFER:
+            x['action'] = gate(x['im0s'], can_reuse=bool(last_det))
+        if trackers and x['action'] == INFER and x['index'] % track_every and \
+                not any(t.uncertain() for t in trackers.values()):
+            x['action'] = TRACK  # between keyframes
+        if x['action'] != INFER:
+            x['t'] = 0.0
+            return x
 
         # Inference
-        visualize = increment_path(save_dir / Path(path).stem, mkdir=True) if visualize else False
-        pred = model(im, augment=augment, visualize=visualize)
-        t3 = time_sync()
-        dt[1] += t3 - t2
-
-        # NMS
-        pred = non_max_suppression(pred, conf_thres, iou_thres, classes, agnostic_nms, max_det=max_det)
-        dt[2] += time_sync() - t3
+        v = increment_path(save_dir / Path(x['path']).stem, mkdir=True) if visualize else False
+        t = time_sync()
+        if pool:  # NMS on the workers, detections in im0 pixels
+            x['pred'] = [torch.from_numpy(d) for d in pool.infer(x['im0s'])]
+            x['t'], x['scaled'] = time_sync() - t, True
+            return x
+        with session.lock:
+            if tiler:
+                x['pred'] = [torch.cat([model(tile_input(tiles[j:j + tile_batch]), augment=augment)
+                                        for j in range(0, len(tiles), tile_batch)]) for tiles, _ in x['tiles']]
+                x['full'] = model(x['im'], augment=augment, visualize=v) if tile_full else None
+            elif x['regions']:
+                x['pred'] = [model(im, augment=augment) for im, _, _ in x['regions']]
+            else:
+                x['pred'] = model(x['im'], augment=augment, visualize=v)
+        x['t'] = time_sync() - t
+        return x
+
+    @torch.no_grad()
+    def nms(x):
+        im0s = x['im0s'] if isinstance(x['im0s'], list) else [x['im0s']]
+        if x['action'] == INFER and pool:
+            pass
+        elif x['action'] == INFER and tiler:  # tile detections merged in im0 pixels
+            full = non_max_suppression(x['full'], conf_thres, iou_thres, classes, agnostic_nms, max_det=max_det) \
+                if tile_full else [None] * len(im0s)
+            pred = []
+            for p, (_, offsets), f, im0 in zip(x['pred'], x['tiles'], full, im0s):
+                if f is not None:
+                    f[:, :4] = scale_coords(x['im'].shape[2:], f[:, :4], im0.shape)
+                det = non_max_suppression(p, conf_thres, iou_thres, classes, agnostic_nms, max_det=max_det)
+                pred.append(merge(det, offsets, im0.shape, f, iou_thres, agnostic_nms, max_det).round())
+            x['pred'], x['scaled'] = pred, True
+        elif x['action'] == INFER and x['regions']:  # ROI crop detections merged in im0 pixels
+            pred = []
+            for p, (im, offsets, shapes), im0 in zip(x['pred'], x['regions'], im0s):
+                det = non_max_suppression(p, conf_thres, iou_thres, classes, agnostic_nms, max_det=max_det)
+                for d, shape in zip(det, shapes):
+                    d[:, :4] = scale_coords(im.shape[2:], d[:, :4], shape)
+                pred.append(merge(det, offsets, im0.shape, None, iou_thres, agnostic_nms, max_det).round())
+            x['pred'], x['scaled'] = pred, True
+        elif x['action'] == INFER:
+            x['pred'] = non_max_suppression(x['pred'], conf_thres, iou_thres, classes, agnostic_nms, max_det=max_det)
+        elif trackers is None:  # REUSE
+            x['pred'] = [last_det.get(i, torch.zeros((0, 6), device=device)) for i in range(len(im0s))]
 
         # Second-stage classifier (optional)
-        # pred = utils.general.apply_classifier(pred, classifier_model, im, im0s)
-
+        # x['pred'] = utils.general.apply_classifier(x['pred'], classifier_model, x['im'], x['im0s'])
+
+        # Tracking, boxes in im0 pixels with a track id column
+        if trackers is not None:
+            pred = []
+            for i, im0 in enumerate(im0s):
+                tracker = trackers.setdefault(i, Sort())
+                if x['action'] == INFER:  # keyframe
+                    det = x['pred'][i]
+                    if not x.get('scaled'):
+                        det[:, :4] = scale_coords(x['im'].shape[2:], det[:, :4], im0.shape)
+                    t = tracker.update(det.cpu().numpy())
+                else:
+                    t = tracker.step()
+                t[:, :4] = t[:, :4].round()
+                pred.append(torch.from_numpy(t).float())
+            x['pred'], x['scaled'] = pred, True
+        return x
+
+    @torch.no_grad()
+    def annotate(x):
         # Process predictions
-        for i, det in enumerate(pred):  # per image
-            seen += 1
-            if webcam:  # batch_size >= 1
-                p, im0, frame = path[i], im0s[i].copy(), dataset.count
+        im, s, results = x['im'], x['s'], []
+        for i, det in enumerate(x['pred']):  # per image
+            if isinstance(x['path'], list):  # batch_size >= 1
+                p, im0 = x['path'][i], x['im0s'][i].copy()
                 s += f'{i}: '
             else:
-                p, im0, frame = path, im0s.copy(), getattr(dataset, 'frame', 0)
+                p, im0 = x['path'], x['im0s'].copy()
 
             p = Path(p)  # to Path
             save_path = str(save_dir / p.name)  # im.jpg
-            txt_path = str(save_dir / 'labels' / p.stem) + ('' if dataset.mode == 'image' else f'_{frame}')  # im.txt
+            txt_path = str(save_dir / 'labels' / p.stem) + ('' if x['mode'] == 'image' else f'_{x["frame"]}')  # im.txt
             s += '%gx%g ' % im.shape[2:]  # print string
             gn = torch.tensor(im0.shape)[[1, 0, 1, 0]]  # normalization gain whwh
             imc = im0.copy() if save_crop else im0  # for save_crop
             annotator = Annotator(im0, line_width=line_thickness, example=str(names))
-            if len(det):
+            found, labels = None, []  # detected class set, --save-txt rows
+            for r in x['rois'][i] if x.get('rois') else ():
+                annotator.box_label(r, color=(128, 128, 128))
+            if x['action'] != INFER:  # last detections or tracks, already in im0 pixels
+                s += f"{x['action']}ed " if x['action'] == TRACK else 'reused '
+            elif len(det) and not x.get('scaled'):
                 # Rescale boxes from img_size to im0 size
                 det[:, :4] = scale_coords(im.shape[2:], det[:, :4], im0.shape).round()
-
-                # !!!!!
+            if (sched or gate) and x['action'] == INFER:
+                last_det[i] = det
+            if len(det):
                 # Print results
-                labels = set()
-                dd = {'wooden comb': '可回收物_木质梳子', 'wooden spatula': '可回收物_木质锅铲', 'wooden carving': '可回收物_木雕',
-                     'pillow': '可回收物_枕头', 'jelly cup': '可回收物_果冻杯', 'archive bag': '可回收物_档案袋', 'chair': '可回收物_椅子',
-                     'mould': '可回收物_模具', 'blanket': '可回收物_毛毯', 'kettle': '可回收物_水壶', 'foam board': '可回收物_泡沫板',
-                     'foam box': '可回收物_泡沫盒子', 'fire extinguisher': '可回收物_灭火器', 'lampshade': '可回收物_灯罩',
-                     'ashtray': '可回收物_烟灰缸', 'thermos bottle': '可回收物_热水瓶', 'gas stove': '可回收物_燃气灶',
-                     'glass products': '可回收物_玻璃制品', 'glassware': '可回收物_玻璃器皿', 'glass pot': '可回收物_玻璃壶',
-                     'glass cup': '可回收物_玻璃杯', 'glass ball': '可回收物_玻璃球', 'electric shaver': '可回收物_电动剃须刀',
-                     'electric curling stick': '可回收物_电动卷发棒', 'electronic scale': '可回收物_电子秤',
-                     'electric blanket': '可回收物_电热毯', 'electric iron': '可回收物_电熨斗', 'electromagnetic furnace': '可回收物_电磁炉',
-                     'remote control': '可回收物_电视遥控器', 'circuit board': '可回收物_电路板', 'electric fan': '可回收物_电风扇',
-                     'rice cooker': '可回收物_电饭煲', 'boarding pass': '可回收物_登机牌', 'plate': '可回收物_盘子', 'bowl': '可回收物_碗',
-                     'tape cartridge': '可回收物_磁带盒', 'magnet': '可回收物_磁铁',
-                     'remote control for air conditioner': '可回收物_空调遥控器', 'cage': '可回收物_笼子', 'paper': '可回收物_纸张',
-                     'card': '可回收物_卡', 'carton': '可回收物_纸箱', 'paper bag': '可回收物_纸袋', 'can': '可回收物_罐头瓶',
-                     'network card': '可回收物_网卡', 'earmuff': '可回收物_耳套', 'hearset': '可回收物_耳机', 'earrings': '可回收物_耳钉耳环',
-                     'doll': '可回收物_芭比娃娃', 'tea pot': '可回收物_茶叶罐', 'cake box': '可回收物_蛋糕盒', 'screwdriver': '可回收物_螺丝刀',
-                     'coat hanger': '可回收物_衣架', 'Socks': '可回收物_袜子', 'trousers': '可回收物_裤子', 'calculator': '可回收物_计算器',
-                     'stapler': '可回收物_订书机', 'microphone': '可回收物_话筒', 'soymilk machine': '可回收物_豆浆机',
-                     'router': '可回收物_路由器', 'checkers': '可回收物_跳棋', 'plastic bags': '其他垃圾_PE塑料袋',
-                     'paper clip': '其他垃圾_U型回形针', 'disposable cup': '其他垃圾_一次性杯子', 'cotton swab': '其他垃圾_一次性棉签',
-                     'bamboo stick': '其他垃圾_串串竹签', 'sticky note': '其他垃圾_便利贴', 'band aid': '其他垃圾_创可贴',
-                     'toilet paper': '其他垃圾_卫生纸', 'rubber gloves': '其他垃圾_厨房手套', 'facemask': '其他垃圾_口罩',
-                     'album': '其他垃圾_唱片', 'pin': '其他垃圾_图钉', 'desiccant': '其他垃圾_干燥剂', 'foam screen': '其他垃圾_打泡网',
-                     'lighter': '其他垃圾_打火机', 'bath towel': '其他垃圾_搓澡巾', 'nut shell': '其他垃圾_果壳', 'towel': '其他垃圾_毛巾',
-                     'correction tape': '其他垃圾_涂改带', 'wet tissue': '其他垃圾_湿纸巾', 'cigarette butts': '其他垃圾_烟蒂',
-                     'toothbrush': '其他垃圾_牙刷', 'electric mosquito repellent incense': '其他垃圾_电蚊香',
-                     'scouring pad': '其他垃圾_百洁布', 'glasses': '其他垃圾_眼镜', 'air conditioning filter': '其他垃圾_空调滤芯',
-                     'pen': '其他垃圾_笔', 'pen refill': '其他垃圾_笔芯', 'sticky tape': '其他垃圾_胶带', 'glue packaging': '其他垃圾_胶水废包装',
-                     'fly swatter': '其他垃圾_苍蝇拍', 'teapot': '其他垃圾_茶壶', 'straw hat': '其他垃圾_草帽', 'cutting board': '其他垃圾_菜板',
-                     'ticket': '其他垃圾_票', 'mouldproof piece': '其他垃圾_防霉防蛀片', 'desiccant bag': '其他垃圾_除湿袋',
-                     'napkin': '其他垃圾_餐巾纸', 'food box': '其他垃圾_餐盒', 'pregnancy test kit': '其他垃圾_验孕棒',
-                     'feather duster': '其他垃圾_鸡毛掸', 'table tennis racquet': '可回收物_乒乓球拍', 'book': '可回收物_书',
-                     'weighing scale': '可回收物_体重秤', 'vacuum cup': '可回收物_保温杯', 'crisper': '可回收物_保鲜盒',
-                     'plastic wrap box': '可回收物_保鲜膜带齿盒', 'envelope': '可回收物_信封', 'children toy': '可回收物_儿童玩具',
-                     'charging head': '可回收物_充电头', 'charging treasure': '可回收物_充电宝',
-                     'rechargeable toothbrush': '可回收物_充电牙刷', 'charging cable': '可回收物_充电线',
-                     'eight treasure porridge jar': '可回收物_八宝粥罐', 'stool': '可回收物_凳子', 'knife': '可回收物_刀',
-                     'razor blade': '可回收物_剃须刀片', 'scissors': '可回收物_剪刀', 'spoon': '可回收物_勺子', 'fork': '可回收物_叉子',
-                     'backpacks': '可回收物_双肩包', 'morphing toys': '可回收物_变形玩具', 'desk calendar': '可回收物_台历',
-                     'table lamp': '可回收物_台灯', 'hangtags': '可回收物_吊牌', 'blow dryer': '可回收物_吹风机', 'apron': '可回收物_围裙',
-                     'globe': '可回收物_地球仪', 'metro ticket': '可回收物_地铁票', 'cushion': '可回收物_垫子',
-                     'plastic buckle': '可回收物_塑料扣', 'plastic cup lid': '可回收物_塑料杯盖', 'plastic bottles': '可回收物_塑料瓶',
-                     'plastic basins': '可回收物_塑料盆', 'plastic box': '可回收物_塑料盒', 'milk box': '可回收物_奶盒',
-                     'milk powder cans': '可回收物_奶粉罐', 'ruler': '可回收物_尺子', 'nylon rope': '可回收物_尼龙绳',
-                     'nylon bag': '可回收物_尼龙袋', 'cloth products': '可回收物_布制品', 'ragdoll': '可回收物_布娃娃', 'hat': '可回收物_帽子',
-                     'handbag': '可回收物_手提包', 'cell phone': '可回收物_手机', 'flashlight': '可回收物_手电筒', 'wristwatch': '可回收物_手表',
-                     'bracelet': '可回收物_手链', 'packing rope': '可回收物_打包绳', 'packing bags': '可回收物_打包袋',
-                     'printer': '可回收物_打印机', 'printer cartridges': '可回收物_打印机墨盒', 'pump': '可回收物_打气筒',
-                     'empty bottle of skincare products': '可回收物_护肤品空瓶', 'newspaper': '可回收物_报纸', 'slippers': '可回收物_拖鞋',
-                     'plug-in board': '可回收物_插线板', 'washboard': '可回收物_搓衣板', 'radio': '可回收物_收音机',
-                     'magnifying glass': '可回收物_放大镜', 'the calendar': '可回收物_日历', 'cans': '可回收物_易拉罐',
-                     'hand warmer': '可回收物_暖手宝', 'telescope': '可回收物_望远镜', 'wooden cutting board': '可回收物_木制切菜板',
-                     'wooden toys': '可回收物_木制玩具', 'cask': '可回收物_木桶', 'stick': '可回收物_木棍', 'car key': '可回收物_车钥匙',
-                     'filter screen': '可回收物_过滤网', 'measuring cup': '可回收物_量杯', 'metal basin': '可回收物_金属盆',
-                     'metal disk': '可回收物_金属盘', 'metal bowl': '可回收物_金属碗', 'metal key chain': '可回收物_金属钥匙扣',
-                     'nail': '可回收物_钉子', 'iron wire ball': '可回收物_铁丝球', 'aluminum products': '可回收物_铝制用品',
-                     'aluminum cover': '可回收物_铝盖', 'pot': '可回收物_锅', 'pot cover': '可回收物_锅盖', 'keyboard': '可回收物_键盘',
-                     'tweezers': '可回收物_镊子', 'alarm clock': '可回收物_闹钟', 'umbrella': '可回收物_雨伞', 'coin purse': '可回收物_零钱包',
-                     'shoes': '可回收物_鞋', 'sound': '可回收物_音响', 'placemat': '可回收物_餐垫', 'fish bowl': '可回收物_鱼缸',
-                     'egg box': '可回收物_鸡蛋包装盒', 'mouse': '可回收物_鼠标', 'health care bottle': '有害垃圾_保健品瓶',
-                     'oral liquid bottle': '有害垃圾_口服液瓶', 'cough syrup bottle': '有害垃圾_咳嗽糖浆玻璃瓶', 'nail polish': '有害垃圾_指甲油',
-                     'insecticide': '有害垃圾_杀虫剂', 'thermometer': '有害垃圾_温度计', 'eye drop bottle': '有害垃圾_滴眼液瓶',
-                     'light bulb': '有害垃圾_灯泡', 'glass tube': '有害垃圾_玻璃灯管', 'physiological saline bottle': '有害垃圾_生理盐水瓶',
-                     'battery': '有害垃圾_电池', 'battery panel': '有害垃圾_电池板', 'iodophor bottle': '有害垃圾_碘伏空瓶',
-                     'safflower oil': '有害垃圾_红花油', 'button battery': '有害垃圾_纽扣电池', 'glue': '有害垃圾_胶水',
-                     'drug packaging': '有害垃圾_药品包装', 'tablet': '有害垃圾_药片', 'ointment': '有害垃圾_药膏',
-                     'storage battery': '有害垃圾_蓄电池', 'sphygmomanometer': '有害垃圾_血压计'}
-
-                for c in det[:, -1].unique():
-                    n = (det[:, -1] == c).sum()  # detections per class
-                    s += f"{n} {names[int(c)]}{'s' * (n > 1)}, "  # add to string
-                    if names[int(c)] not in labels:
-                        labels.add(names[int(c)])
-                if show_text and labels:
-                    string = "可能存在如下垃圾，请及时处理！\n"
-                    for nn in labels:
-                        string += dd[nn].split('_')[1]
-                        string += "，该垃圾应当是："
-                        string += dd[nn].split('_')[0]
-                        string += '\n'
-                    show_text.setText(string)
+                n = meta.histogram(det[:, 5])  # detections per class
+                for c in n.nonzero()[0]:
+                    s += f"{n[c]} {names[c]}{'s' * int(n[c] > 1)}, "  # add to string
+                if meta:  # detections per waste category
+                    k = meta.category_histogram(det[:, 5])
+                    s += ''.join(f'{k[j]} {meta.categories[j]}, ' for j in k.nonzero()[0])
+                found = meta.classes(det[:, 5])  # for the waste-category summary
+                if trackers is not None:  # count distinct tracked objects instead
+                    ids = track_ids.setdefault(i, {})
+                    for c, tid in det[:, 5:7].int().tolist():
+                        ids.setdefault(c, set()).add(tid)
+                    found = frozenset((c, len(v)) for c, v in ids.items())
 
                 # Write results
-                for *xyxy, conf, cls in reversed(det):
-                    if save_txt:  # Write to file
-                        xywh = (xyxy2xywh(torch.tensor(xyxy).view(1, 4)) / gn).view(-1).tolist()  # normalized xywh
-                        line = (cls, *xywh, conf) if save_conf else (cls, *xywh)  # label format
-                        with open(txt_path + '.txt', 'a') as f:
-                            f.write(('%g ' * len(line)).rstrip() % line + '\n')
-
+                if save_txt:  # label rows, written by the sink with one write per image
+                    labels = label_rows(det, gn, save_conf)[::-1]
+                ids = det[:, 6].int().tolist()[::-1] if det.shape[1] > 6 else [None] * len(det)  # track ids
+                for (*xyxy, conf, cls), tid in zip(reversed(det[:, :6]), ids):
                     if save_img or save_crop or view_img:  # Add bbox to image
                         c = int(cls)  # integer class
-                        label = None if hide_labels else (names[c] if hide_conf else f'{names[c]} {conf:.2f}')
+                        name = names[c] if tid is None else f'{names[c]} #{tid}'
+                        label = None if hide_labels else (name if hide_conf else f'{name} {conf:.2f}')
                         annotator.box_label(xyxy, label, color=colors(c, True))
                         if save_crop:
-                            # !!!!!
-                            # save_one_box(xyxy, imc, file=save_dir / 'crops' / names[c] / f'{p.stem}.jpg', BGR=True)
-                            pass
+                            crop = save_one_box(xyxy, imc, BGR=True, save=False)
+                            writer.write(save_dir / 'crops' / names[c] / f'{p.stem}.jpg', crop, unique=True)
+
+            results.append((i, p, save_path, annotator.result(), found, (txt_path, labels)))
+        x['s'], x['results'] = s, results
+        return x
+
+    pipe = Pipeline(capture(), [('preprocess', preprocess, w[0]),
+                                ('infer', infer, len(pool) if pool and not track else 1),  # one per replica
+                                ('nms', nms, w[2]),
+                                ('annotate', annotate, w[3])],
+                    maxsize=pipeline_queue, policy=pipeline_policy, threaded=pipeline)
+    seen, last_found = 0, {}  # images seen, last summarised class set per stream
+    labels_file = open(save_dir / 'labels' / 'labels.txt', 'a') if save_txt_single else None
+    if view_img and show_camera:
+        from utils.qt import show_frame  # PyQt5, GUI label sink only
+    control.start()
+    for x in pipe:
+        while control.paused and not control.stopped:
+            control.wait(0.05)
+            if view_img and not on_frame:
+                cv2.waitKey(1)  # keep GUI events flowing while paused
+        if control.stopped:
+            break
+
+        vid_cap = x['vid_cap']
+        for i, p, save_path, im0, found, (txt_path, labels) in x['results']:
+            if labels:  # --save-txt
+                if save_txt_single:  # source stem and frame number (0 for images), as the per-image label file names
+                    key = f"{p.stem} {x['frame'] if x['mode'] != 'image' else 0}"
+                    labels_file.write(''.join(f'{key} {r}\n' for r in labels))
+                else:
+                    with open(txt_path + '.txt', 'a') as f:
+                        f.write('\n'.join(labels) + '\n')
+            seen += 1
+            if on_text and meta and found and found != last_found.get(i):  # only when the class set changes
+                last_found[i] = found
+                text = meta.text(dict(found) if trackers is not None else found)
+                if text:
+                    on_text(text)
 
             # Stream results
-            im0 = annotator.result()
-            file1 = open(ROOT / "save.txt", 'r')
-            ttttt = file1.read().strip()
-            file1.close()
-            if my_save_path and my_save_path[-1] not in ['/', '\\']:
-                my_save_path += '/'
-            if ttttt == '1' and my_save_path and my_count % 10 == 0:
-                string = my_save_path + str(my_count//10).zfill(6) + '.jpg'
-                print(' '.join([string, 'saved to', my_save_path]))
-                cv2.imwrite(string, im0)
+            snapshot = control.snapshot_file(my_count)
+            if snapshot:
+                LOGGER.info(f'Snapshot {snapshot} saved to {control.save_path}')
+                writer.write(snapshot, im0)
             my_count += 1
             if view_img:
-                # cv2.imshow(str(p), im0) # !!!!!
-                file1 = open(ROOT / "global.txt", 'r')
-                ttt = file1.read().strip()
-                file1.close()
-                if ttt == '2':
-                    return
-                    # dataset.cap.release()
-                    # cv2.destroyAllWindows()
-                    # raise StopIteration
-                frame = cv2.cvtColor(im0, cv2.COLOR_BGR2RGB)
-                img = QPixmap(QImage(frame, 640, 480, QImage.Format_RGB888))
-                # img = img.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                show_camera.setPixmap(img)
-                cv2.waitKey(1)  # 1 millisecond
+                if on_frame:  # GUI paints on its own thread
+                    on_frame(im0)
+                else:
+                    if show_camera:  # !!!!!
+                        show_frame(show_camera, im0)  # zero-copy BGR QImage, any resolution
+                    else:
+                        cv2.imshow(str(p), im0)
+                    cv2.waitKey(1)  # 1 millisecond
 
             # Save results (image with detections)
             if save_img:
-                if dataset.mode == 'image':
-                    cv2.imwrite(save_path, im0)
-                else:  # 'video' or 'stream'
+                if x['mode'] == 'image':
+                    writer.write(save_path, im0)
+                elif found or not vid_det_only:  # 'video' or 'stream'
                     if vid_path[i] != save_path:  # new video
                         vid_path[i] = save_path
-                        if isinstance(vid_writer[i], cv2.VideoWriter):
-                            vid_writer[i].release()  # release previous video writer
+                        if isinstance(vid_writer[i], VideoSink):
+                            vid_writer[i].close()  # release previous video writer
                         if vid_cap:  # video
-                            fps = vid_cap.get(cv2.CAP_PROP_FPS)
-                            w = int(vid_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                            h = int(vid_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                            fps = vid_cap.get(cv2.CAP_PROP_FPS) / (1 if vid_latest else vid_stride)
+                            fw = int(vid_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+                            fh = int(vid_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
                         else:  # stream
-                            fps, w, h = 30, im0.shape[1], im0.shape[0]
+                            fps, fw, fh = dataset.fps[i], im0.shape[1], im0.shape[0]
                         save_path = str(Path(save_path).with_suffix('.mp4'))  # force *.mp4 suffix on results videos
-                        vid_writer[i] = cv2.VideoWriter(save_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
-                    vid_writer[i].write(im0)
+                        vid_writer[i] = VideoSink(save_path, fps, (fw, fh), vid_queue, save_policy, vid_scale,
+                                                  derive=vid_latest or not vid_cap)  # frames skipped at run time
+                    vid_writer[i].write(im0, x['t0'])  # capture time, real time for streams and vid_latest
 
         # Print time (inference-only)
-        if ttt == '1':
-            LOGGER.info(f'{s}Done. ({t3 - t2:.3f}s)')
+        LOGGER.info(f"{x['s']}Done. ({x['t']:.3f}s)")
+        if sched:
+            sched.done(x['action'], x['t0'], x['t_decide'])
+    pipe.close()
+    if hasattr(dataset, 'close'):
+        dataset.close()  # capture processes, prefetch pool, video decoder
+    if pool:  # kept on the session for the next run()
+        LOGGER.info(f'Worker pool: {pool}')
+    writer.close()  # flush queued images
+    if labels_file:
+        labels_file.close()
+    sinks = [v for v in vid_writer if isinstance(v, VideoSink)]
+    for v in sinks:
+        v.close()  # encode queued frames
+    control.finish()
+    dt = [pipe.stats[k].total for k in ('preprocess', 'infer', 'nms')]
+    if pipeline:
+        LOGGER.info(f'Pipeline: {pipe.summary()}')
+    if writer.queued:
+        LOGGER.info(f'Writer: {writer}')
+    for v in sinks:
+        LOGGER.info(f'Video: {v}')
+    for f, frames in getattr(dataset, 'analysed', {}).items():  # video frame numbers analysed
+        LOGGER.info(f'{Path(f).name}: {len(frames)} frames analysed, vid-stride {vid_stride}, latest {vid_latest}')
+        if save_txt or save_img:
+            (save_dir / f'{Path(f).stem}_frames.txt').write_text(''.join(f'{n}\n' for n in frames))
+    if webcam:
+        LOGGER.info(f'Streams: {dataset.summary()}')
+    if sched:
+        LOGGER.info(f'Scheduler: {sched}')
+    if gate:
+        LOGGER.info(f'Motion gate: {gate}')
+    for i, tracker in (trackers or {}).items():
+        LOGGER.info(f'Tracker {i}: {tracker}')
+    if getattr(dataset, 'decoded', 0):  # image decode, not part of the pre-process time below
+        step = 'imread' if dataset.raw else 'imread + letterbox'  # raw frames are letterboxed by the Preprocessor
+        LOGGER.info(f'Decode: {dataset.decode_time / dataset.decoded * 1E3:.1f}ms {step} per image, '
+                    f'{dataset.decoded} images, read-ahead {dataset.prefetch}')
 
     # Print results
-    t = tuple(x / seen * 1E3 for x in dt)  # speeds per image
+    t = tuple(x / max(seen, 1) * 1E3 for x in dt)  # speeds per image
     LOGGER.info(f'Speed: %.1fms pre-process, %.1fms inference, %.1fms NMS per image at shape {(1, 3, *imgsz)}' % t)
     if save_txt or save_img:
         s = f"\n{len(list(save_dir.glob('labels/*.txt')))} labels saved to {save_dir / 'labels'}" if save_txt else ''
         LOGGER.info(f"Results saved to {colorstr('bold', save_dir)}{s}")
     if update:
-        strip_optimizer(weights)  # update model (to fix SourceChangeWarning)
+        strip_optimizer(session.weights)  # update model (to fix SourceChangeWarning)
     return save_path    # !!!!!
 
 
@@ -339,10 +603,29 @@ def parse_opt():
     parser.add_argument('--conf-thres', type=float, default=0.25, help='confidence threshold')
     parser.add_argument('--iou-thres', type=float, default=0.45, help='NMS IoU threshold')
     parser.add_argument('--max-det', type=int, default=1000, help='maximum detections per image')
+    parser.add_argument('--batch-size', type=int, default=1, help='images per forward pass for image sources')
+    parser.add_argument('--prefetch', type=int, default=0, help='image files decoded ahead on a thread pool')
+    parser.add_argument('--vid-stride', type=int, default=1, help='analyse every Nth video frame')
+    parser.add_argument('--vid-latest', action='store_true', help='real-time video playback, analyse newest frame only')
+    parser.add_argument('--fused-preprocess', action='store_true', help='letterbox and normalise in one torch pass')
+    parser.add_argument('--reuse-buffers', action='store_true', help='letterbox video frames into persistent buffers')
+    parser.add_argument('--rt-fps', type=float, default=0, help='real-time scheduler target inference FPS')
+    parser.add_argument('--rt-latency', type=float, default=0, help='real-time scheduler max latency (ms)')
+    parser.add_argument('--motion-gate', type=float, default=0, help='changed pixel fraction that triggers inference')
+    parser.add_argument('--motion-refresh', type=int, default=30, help='motion gate forced inference interval')
+    parser.add_argument('--track', action='store_true', help='SORT tracking with track ids after NMS')
+    parser.add_argument('--track-every', type=int, default=1, help='run the detector every Nth frame when tracking')
+    parser.add_argument('--tile', type=int, default=0, help='sliced inference tile size (pixels), 0 to disable')
+    parser.add_argument('--tile-overlap', type=float, default=0.2, help='sliced inference tile overlap fraction')
+    parser.add_argument('--tile-full', action='store_true', help='merge a full-image pass with the tiles')
+    parser.add_argument('--tile-batch', type=int, default=8, help='max tiles per forward pass')
+    parser.add_argument('--roi', type=int, nargs=4, action='append', dest='rois', metavar=('X1', 'Y1', 'X2', 'Y2'),
+                        help='region of interest in frame pixels, repeat for several (ignored with --tile)')
     parser.add_argument('--device', default='', help='cuda device, i.e. 0 or 0,1,2,3 or cpu')
     parser.add_argument('--view-img', action='store_true', help='show results')
     parser.add_argument('--save-txt', action='store_true', help='save results to *.txt')
     parser.add_argument('--save-conf', action='store_true', help='save confidences in --save-txt labels')
+    parser.add_argument('--save-txt-single', action='store_true', help='save labels to one file, with source, frame')
     parser.add_argument('--save-crop', action='store_true', help='save cropped prediction boxes')
     parser.add_argument('--nosave', action='store_true', help='do not save images/videos')
     parser.add_argument('--classes', nargs='+', type=int, help='filter by class: --classes 0, or --classes 0 2 3')
@@ -358,6 +641,24 @@ def parse_opt():
     parser.add_argument('--hide-conf', default=False, action='store_true', help='hide confidences')
     parser.add_argument('--half', action='store_true', help='use FP16 half-precision inference')
     parser.add_argument('--dnn', action='store_true', help='use OpenCV DNN for ONNX inference')
+    parser.add_argument('--pipeline', action='store_true', help='pipelined multi-threaded stage execution')
+    parser.add_argument('--pipeline-workers', nargs='+', type=int, default=[1, 1, 1, 1],
+                        help='worker threads per stage: preprocess infer nms annotate')
+    parser.add_argument('--pipeline-queue', type=int, default=4, help='max items queued between pipeline stages')
+    parser.add_argument('--pipeline-policy', default='block', choices=['block', 'drop'],
+                        help='full-queue backpressure policy, drop discards the oldest queued item')
+    parser.add_argument('--stream-processes', action='store_true', help='capture streams in separate processes')
+    parser.add_argument('--cpu-workers', type=int, default=0, help='model replicas in worker processes, 0 in-process')
+    parser.add_argument('--cpu-threads', type=int, default=0, help='torch threads per worker process, 0 to split cores')
+    parser.add_argument('--cpu-affinity', action='store_true', help='pin each worker process to its own cores')
+    parser.add_argument('--save-workers', type=int, default=2, help='image/snapshot/crop writer threads')
+    parser.add_argument('--save-queue', type=int, default=16, help='max images queued for writing')
+    parser.add_argument('--save-policy', default=None, choices=['block', 'drop'],
+                        help='full writer queue policy, default drop for streams and block for files')
+    parser.add_argument('--vid-queue', type=int, default=32, help='max frames queued per video sink')
+    parser.add_argument('--vid-scale', type=float, default=1.0, help='save videos downscaled by this factor')
+    parser.add_argument('--vid-det-only', action='store_true', help='save only video frames with detections')
+    parser.add_argument('--offline', action='store_true', help='skip network checks and downloads, or YOLOv5_OFFLINE=true')
     opt = parser.parse_args()
     opt.imgsz *= 2 if len(opt.imgsz) == 1 else 1  # expand
     print_args(FILE.stem, opt)
@@ -365,8 +666,11 @@ def parse_opt():
 
 
 def main(opt):
-    check_requirements(exclude=('tensorboard', 'thop'))
+    if not opt.offline:
+        check_requirements(exclude=('tensorboard', 'thop'))
     run(**vars(opt))
+    for session in SESSIONS.values():
+        session.close()
 
 
 if __name__ == "__main__":
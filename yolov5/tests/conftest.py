@@ -0,0 +1,25 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Test configuration, run from the YOLOv5 root: python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+import torch
+
+ROOT = Path(__file__).resolve().parents[1]  # YOLOv5 root directory
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+from models.yolo import Model  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def weights(tmp_path_factory):
+    # Untrained YOLOv5n checkpoint, conf_thres=1e-6 still gives detections
+    torch.manual_seed(0)
+    f = tmp_path_factory.mktemp('weights') / 'yolov5n.pt'
+    torch.save({'ema': None, 'model': Model(ROOT / 'models/yolov5n.yaml', nc=80).half()}, f)
+    return f
@@ -0,0 +1,21 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Letterbox geometry tests
+"""
+
+import numpy as np
+import pytest
+
+from utils.augmentations import letterbox, letterbox_shape
+
+SHAPES = [(480, 640), (640, 480), (720, 1280), (1080, 1920), (333, 500), (100, 100), (37, 1001)]
+
+
+@pytest.mark.parametrize('shape', SHAPES)
+@pytest.mark.parametrize('auto', [True, False])
+@pytest.mark.parametrize('new_shape', [640, (320, 640)])
+def test_letterbox_shape_matches_letterbox(shape, auto, new_shape):
+    im = np.zeros((*shape, 3), np.uint8)
+    assert letterbox_shape(shape, new_shape, auto=auto) == letterbox(im, new_shape, auto=auto)[0].shape[:2]
+    assert letterbox_shape(shape, new_shape, auto=auto, scaleup=False) == \
+        letterbox(im, new_shape, auto=auto, scaleup=False)[0].shape[:2]
@@ -0,0 +1,55 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Micro-batching tests
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from utils.batching import MicroBatcher
+
+
+def serve(batcher, calls):
+    # Await calls() on a fresh event loop, stopping the batcher's background task afterwards
+    async def main():
+        try:
+            return await calls()
+        finally:
+            batcher.task.cancel()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_callers_are_batched():
+    calls = []
+
+    def fn(items):
+        calls.append(list(items))
+        time.sleep(0.05)
+        return [x * 10 for x in items]
+
+    batcher = MicroBatcher(fn, max_batch=4, max_wait=0.05)
+    results = serve(batcher, lambda: asyncio.gather(*(batcher(i) for i in range(10))))
+    assert results == [i * 10 for i in range(10)]  # each caller gets its own result
+    assert [len(c) for c in calls] == [4, 4, 2] and sum(calls, []) == list(range(10))
+    assert batcher.stats() == {'batches': 3, 'items': 10, 'max_batch': 4}
+    assert str(batcher) == '10 items in 3 batches, mean batch 3.33, max batch 4'
+
+
+def test_lone_caller_waits_at_most_max_wait():
+    batcher = MicroBatcher(lambda items: items, max_batch=8, max_wait=0.01)
+    t = time.time()
+    assert serve(batcher, lambda: batcher('a')) == 'a'
+    assert time.time() - t < 0.5 and batcher.stats()['max_batch'] == 1
+
+
+def test_errors_reach_every_caller_of_the_batch():
+    def fn(items):
+        raise ValueError('bad batch')
+
+    batcher = MicroBatcher(fn, max_batch=2, max_wait=0.05)
+    with pytest.raises(ValueError, match='bad batch'):
+        serve(batcher, lambda: asyncio.gather(batcher(1), batcher(2)))
+    assert batcher.batches == 1
@@ -0,0 +1,38 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+ClassMeta tests
+"""
+
+import numpy as np
+import torch
+
+from utils.categories import ClassMeta
+
+NAMES = ['battery', 'bottle', 'banana peel', 'person']
+CATEGORIES = {'battery': ['有害垃圾', '电池'], 'bottle': ['可回收物', '瓶子'], 'banana peel': ['厨余垃圾', '香蕉皮']}
+
+
+def test_from_yaml(tmp_path):
+    file = tmp_path / 'data.yaml'
+    file.write_text('categories:\n  battery: [有害垃圾, 电池]\n  bottle: [可回收物, 瓶子]\n', encoding='utf-8')
+    meta = ClassMeta.from_yaml(NAMES, file)
+    assert meta.categories == ['有害垃圾', '可回收物']  # file order
+    assert meta.category.tolist() == [0, 1, -1, -1]
+    assert meta.display == ['电池', '瓶子', 'banana peel', 'person']
+    assert not ClassMeta.from_yaml(NAMES, tmp_path / 'missing.yaml')  # no metadata
+
+
+def test_histograms():
+    meta = ClassMeta(NAMES, CATEGORIES)
+    cls = torch.tensor([1., 1., 0., 3., 2., 1.])  # det[:, -1]
+    assert meta.histogram(cls).tolist() == [1, 3, 1, 1]
+    assert meta.category_histogram(cls).tolist() == [1, 3, 1]  # 'person' has no category
+    assert meta.category_histogram(np.array([3])).tolist() == [0, 0, 0]
+    assert meta.classes(cls) == frozenset({0, 1, 2, 3})
+
+
+def test_text():
+    meta = ClassMeta(NAMES, CATEGORIES)
+    assert meta.text({3}) is None  # no class with metadata
+    assert meta.text({1, 0, 3}) == meta.header + '电池，该垃圾应当是：有害垃圾\n瓶子，该垃圾应当是：可回收物\n'
+    assert meta.text({1: 2}) == meta.header + '瓶子（2个），该垃圾应当是：可回收物\n'  # distinct tracked objects
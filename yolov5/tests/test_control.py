@@ -0,0 +1,50 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+DetectControl tests
+"""
+
+import threading
+from pathlib import Path
+
+from utils.control import DetectControl
+
+
+def test_stop_before_start_is_kept():
+    control = DetectControl()
+    control.stop()
+    control.start()  # run() entering its loop after the GUI already pressed stop
+    assert control.stopped and control.running
+    control.finish()
+    assert not control.running
+
+
+def test_reset_clears_stop_and_pause():
+    control = DetectControl()
+    control.pause()
+    control.stop()
+    assert not control.paused  # stop wakes a paused loop
+    control.pause()
+    control.reset()
+    assert not control.stopped and not control.paused
+
+
+def test_wait_blocks_while_paused():
+    control = DetectControl()
+    control.pause()
+    assert control.paused
+    assert control.wait(0.01)  # timed out while paused, not stopped
+    threading.Timer(0.05, control.resume).start()
+    assert control.wait(5) and not control.paused
+    control.stop()
+    assert not control.wait(0)
+
+
+def test_snapshot_file_every_10th_frame(tmp_path):
+    control = DetectControl(save_path=tmp_path)
+    assert control.snapshot_file(0) is None  # snapshots off
+    assert control.toggle_snapshot()
+    assert control.snapshot_file(0) == str(tmp_path / '000000.jpg')
+    assert control.snapshot_file(25) is None
+    assert Path(control.snapshot_file(30)).name == '000003.jpg'
+    control.set_save_path('')
+    assert control.snapshot_file(30) is None  # no save path
@@ -0,0 +1,111 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Dataloader tests
+"""
+
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+import pytest
+
+from utils.augmentations import letterbox
+from utils.datasets import LoadImages, LoadStreamProcesses, LoadStreams
+
+
+def write_images(path, shapes):
+    rng = np.random.default_rng(0)
+    files = []
+    for i, shape in enumerate(shapes):
+        files.append(path / f'{i}.png')
+        cv2.imwrite(str(files[-1]), rng.integers(0, 255, (*shape, 3), dtype=np.uint8))
+    return files
+
+
+def test_batches_grouped_by_letterbox_shape(tmp_path):
+    shapes = [(480, 640), (720, 1280), (480, 640), (480, 640), (720, 1280)]
+    write_images(tmp_path, shapes)
+    seen = {}
+    for paths, im, im0s, _, _ in LoadImages(tmp_path, batch_size=2):
+        assert im.shape[0] == len(paths) <= 2
+        for path, x, im0 in zip(paths, im, im0s):  # no extra padding, same pixels as letterbox()
+            assert np.array_equal(x, letterbox(im0, 640, stride=32)[0].transpose((2, 0, 1))[::-1])
+            seen[path] = x.shape
+    assert len(seen) == len(shapes)
+
+
+def test_prefetch_in_order_and_closed(tmp_path):
+    files = write_images(tmp_path, [(64, 96)] * 6)
+    threads = threading.active_count()
+    dataset = LoadImages(tmp_path, prefetch=3)
+    for _ in range(2):  # re-iterable, the pool is restarted by __iter__()
+        assert [path for path, *_ in dataset] == [str(f) for f in files]
+        assert dataset.pool is None  # terminated when iteration ended
+    assert dataset.decoded == 12
+    it = iter(dataset)
+    next(it)
+    assert dataset.pool is not None
+    dataset.close()  # abandoned, i.e. run() stopped early
+    assert dataset.pool is None and threading.active_count() <= threads + 1  # +1 pool handler still exiting
+
+
+def write_video(file, n=10, shape=(48, 64)):
+    writer = cv2.VideoWriter(str(file), cv2.VideoWriter_fourcc(*'mp4v'), 30, shape[::-1])
+    for i in range(n):
+        writer.write(np.full((*shape, 3), i * 20, np.uint8))  # frame number i + 1 in the pixel values
+    writer.release()
+    return file
+
+
+def test_vid_stride_starts_at_first_frame(tmp_path):
+    file = write_video(tmp_path / 'v.mp4', n=10)
+    dataset = LoadImages(file, vid_stride=3)
+    levels = [round(im0.mean() / 20) for _, _, im0, _, _ in dataset]
+    assert dataset.analysed[str(file)] == [1, 4, 7, 10]
+    assert levels == [0, 3, 6, 9]  # frames 1, 4, 7, 10 decoded
+
+
+def test_streams_end_with_source(tmp_path):
+    write_video(tmp_path / 'v.mp4', n=10)
+    (tmp_path / 'streams.txt').write_text(str(tmp_path / 'v.mp4'))
+    dataset = LoadStreams(str(tmp_path / 'streams.txt'), raw=True)
+    frames = [dataset.last[0] for _ in dataset]
+    assert frames == sorted(frames) and frames[-1] <= 10
+    assert frames[-1] - len(frames) == dataset.dropped[0] - dataset.duplicates[0]
+
+
+def test_stalled_stream_repeats_last_frame():
+    # LoadStreams over a camera thread that never delivers another frame
+    dataset = LoadStreams.__new__(LoadStreams)
+    stall = threading.Event()
+    camera = threading.Thread(target=stall.wait, daemon=True)
+    camera.start()
+    im = np.zeros((48, 64, 3), np.uint8)
+    dataset.raw, dataset.lb, dataset.stall, dataset.sources = True, None, 0.1, ['0']
+    dataset.threads, dataset.fps, dataset.ended, dataset.cond = [camera], [30], [False], threading.Condition()
+    dataset.buffers, dataset.seq, dataset.last, dataset.imgs = [deque(maxlen=3)], [1], [1], [im]
+    dataset.dropped, dataset.duplicates = [0], [0]
+    it, t = iter(dataset), time.time()
+    for _ in range(3):
+        assert next(it)[2][0] is im  # returned within `stall`, the caller can check for a stop
+    assert time.time() - t < 3 and dataset.duplicates == [3]
+    stall.set()
+
+
+def test_stream_processes(tmp_path):
+    write_video(tmp_path / 'v.mp4', n=10)
+    (tmp_path / 'bad.txt').write_text(f"{tmp_path / 'v.mp4'}\n{tmp_path / 'missing.mp4'}")
+    with pytest.raises(AssertionError, match='Failed to open'):
+        LoadStreamProcesses(str(tmp_path / 'bad.txt'), raw=True, timeout=30)
+    (tmp_path / 'streams.txt').write_text(str(tmp_path / 'v.mp4'))
+    dataset = LoadStreamProcesses(str(tmp_path / 'streams.txt'), raw=True, hold=2, timeout=30)
+    try:
+        first = dataset.last[0]  # taken by the constructor
+        levels = [round(im0s[0].mean() / 20) for _, _, im0s, _, _ in dataset]  # zero-copy views of the ring
+        assert levels == sorted(levels) and levels[-1] == 9
+        assert dataset.last[0] - first - len(levels) == dataset.dropped[0] - dataset.duplicates[0]
+    finally:
+        dataset.close()
+    assert not any(p.is_alive() for p in dataset.procs)
@@ -0,0 +1,81 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Detection session tests
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+import detect
+from detect import load_session, run
+
+IMGS = detect.ROOT / 'data/images'
+
+
+@pytest.fixture
+def session(weights, monkeypatch):
+    monkeypatch.setenv('TORCH_FORCE_NO_WEIGHTS_ONLY_LOAD', '1')  # full checkpoint pickles
+    session = load_session(weights, device='cpu')
+    yield session
+    session.close()
+
+
+def labels(path):
+    return {f.name: f.read_text() for f in sorted(path.glob('*.txt'))}
+
+
+def test_session_is_cached(session, weights, monkeypatch):
+    assert load_session(weights, device='cpu') is session
+    monkeypatch.setattr(detect, 'DetectMultiBackend', None)  # a reload would fail
+    assert load_session(str(weights), device='cpu') is session
+
+
+def test_predict_numpy(session):
+    im = np.random.default_rng(0).integers(0, 256, (200, 300, 3), dtype=np.uint8)
+    det = session.predict([im, im], imgsz=(128, 128), conf_thres=1e-6, max_det=5)
+    assert len(det) == 2 and det[0].shape == (5, 6) and (det[0] == det[1]).all()
+    assert (det[0][:, [0, 2]] <= 300).all() and (det[0][:, [1, 3]] <= 200).all()  # image pixels
+
+
+def test_runs_reuse_session(session, tmp_path, monkeypatch):
+    # Repeated runs on one warm model give the same labels, with or without the staged pipeline
+    monkeypatch.setattr(detect, 'DetectMultiBackend', None)
+    kw = dict(source=IMGS, session=session, imgsz=(256, 256), conf_thres=1e-6, max_det=5, save_txt=True,
+              save_conf=True, nosave=True, project=tmp_path, exist_ok=True)
+    run(name='a', **kw)
+    run(name='b', **kw)
+    run(name='c', pipeline=True, **kw)
+    a = labels(tmp_path / 'a/labels')
+    assert len(a) == 2 and a == labels(tmp_path / 'b/labels') == labels(tmp_path / 'c/labels')
+
+
+def write_video(file, n=12):
+    # A box moving right over n frames
+    writer = cv2.VideoWriter(str(file), cv2.VideoWriter_fourcc(*'mp4v'), 30, (128, 96))
+    for i in range(n):
+        im = np.full((96, 128, 3), 60, np.uint8)
+        cv2.rectangle(im, (10 + 4 * i, 30), (50 + 4 * i, 70), (255, 255, 255), -1)
+        writer.write(im)
+    writer.release()
+    return str(file)
+
+
+def test_scheduler_with_tracker(session, tmp_path):
+    # In-between tracker frames are shown frames for the real-time scheduler
+    file = write_video(tmp_path / 'v.mp4')
+    run(source=file, session=session, imgsz=(128, 128), conf_thres=1e-6, max_det=5, track=True, track_every=3,
+        rt_fps=1000, save_txt=True, project=tmp_path, name='exp', exist_ok=True)
+    assert len(list((tmp_path / 'exp/labels').glob('*.txt'))) == 12
+
+
+def test_save_txt_single(session, tmp_path):
+    # One labels.txt, rows keyed by source stem and frame number as the per-image label files are named
+    kw = dict(session=session, imgsz=(128, 128), conf_thres=1e-6, max_det=2, save_txt_single=True, nosave=True,
+              project=tmp_path, exist_ok=True)
+    run(source=IMGS, name='images', **kw)
+    run(source=write_video(tmp_path / 'v.mp4', n=10), vid_stride=3, name='video', **kw)
+    rows = [x.split() for x in (tmp_path / 'images/labels/labels.txt').read_text().splitlines()]
+    assert [x[:2] for x in rows] == [['bus', '0']] * 2 + [['zidane', '0']] * 2 and {len(x) for x in rows} == {7}
+    rows = [x.split() for x in (tmp_path / 'video/labels/labels.txt').read_text().splitlines()]
+    assert [x[:2] for x in rows[::2]] == [['v', '1'], ['v', '4'], ['v', '7'], ['v', '10']]
@@ -0,0 +1,45 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+General utils tests
+"""
+
+import socket
+
+import pytest
+
+from utils import downloads, general
+
+
+def no_network(*args, **kwargs):
+    raise AssertionError('network used offline')
+
+
+@pytest.mark.parametrize('value, offline', [('1', True), ('true', True), ('True', True), ('0', False), ('', False)])
+def test_is_offline(monkeypatch, value, offline):
+    monkeypatch.setenv('YOLOv5_OFFLINE', value)
+    assert general.is_offline() == offline
+    monkeypatch.delenv('YOLOv5_OFFLINE')
+    assert not general.is_offline()
+
+
+def test_offline_skips_network(monkeypatch, tmp_path):
+    monkeypatch.setenv('YOLOv5_OFFLINE', 'true')
+    monkeypatch.setattr(socket, 'create_connection', no_network)
+    monkeypatch.setattr(downloads, 'safe_download', no_network)
+    monkeypatch.setattr(general.torch.hub, 'download_url_to_file', no_network)
+    assert not general.check_online()
+    assert downloads.attempt_download(tmp_path / 'yolov5s.pt') == str(tmp_path / 'yolov5s.pt')
+    assert downloads.attempt_download('https://example.com/missing.pt') == 'missing.pt'
+    general.check_font(tmp_path / 'Missing.ttf')
+
+
+def test_offline_skips_requirements(monkeypatch):
+    calls = []
+    monkeypatch.setattr(general, 'check_python', lambda *args, **kwargs: calls.append(args))
+    monkeypatch.setenv('YOLOv5_OFFLINE', '1')
+    general.check_requirements(('surely-not-installed-package',))
+    assert not calls  # returned before the python version, installed packages or pip
+    monkeypatch.delenv('YOLOv5_OFFLINE')
+    monkeypatch.setattr(general, 'check_online', lambda: False)  # the install attempt stops here
+    general.check_requirements(('surely-not-installed-package',), install=False)
+    assert calls
@@ -0,0 +1,54 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+GUI worker tests, Main.py in the parent directory
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip('PyQt5')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')  # no display needed
+
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from utils.control import DetectControl  # noqa: E402
+
+ROOT = Path(__file__).resolve().parents[1]  # YOLOv5 root directory
+if str(ROOT.parent) not in sys.path:
+    sys.path.append(str(ROOT.parent))  # Main.py
+Main = pytest.importorskip('Main')
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def test_frames_coalesce(app):
+    worker = Main.DetectWorker(DetectControl())
+    ready = []
+    worker.frameReady.connect(lambda: ready.append(1))
+    frames = [np.full((4, 4, 3), i, np.uint8) for i in range(3)]
+    for im in frames:
+        worker.putFrame(im)  # GUI busy, frames replace each other
+    assert len(ready) == 1 and worker.latest() is frames[2] and worker.latest() is None
+    worker.putFrame(frames[0])
+    assert len(ready) == 2 and worker.latest() is frames[0]
+
+
+def test_run_errors_reach_gui(app, monkeypatch):
+    def get_session():
+        raise FileNotFoundError('best.pt not found')
+
+    monkeypatch.setattr(Main, 'get_session', get_session)
+    worker = Main.DetectWorker(DetectControl())
+    errors = []
+    worker.failed.connect(errors.append)
+    worker.start()
+    assert worker.wait(10000)
+    app.processEvents()  # queued from the worker thread
+    assert errors == ['best.pt not found']
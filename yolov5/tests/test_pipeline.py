@@ -0,0 +1,72 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Pipeline and StageQueue tests
+"""
+
+import random
+import threading
+import time
+
+import pytest
+
+from utils.pipeline import _END, Pipeline, StageQueue
+
+
+def jitter(x):
+    time.sleep(random.random() * 0.005)  # workers finish out of order
+    return x
+
+
+@pytest.mark.parametrize('threaded', [False, True])
+def test_results_in_capture_order(threaded):
+    stages = [('a', lambda x: jitter(x * 2), 3), ('b', lambda x: jitter(x + 1), 2)]
+    pipe = Pipeline(range(50), stages, maxsize=2, threaded=threaded)
+    assert list(pipe) == [x * 2 + 1 for x in range(50)]
+    assert pipe.stats['a'].n == pipe.stats['b'].n == pipe.stats['capture'].n == 50
+
+
+@pytest.mark.parametrize('threaded', [False, True])
+def test_stage_discards_items(threaded):
+    pipe = Pipeline(range(20), [('odd', lambda x: jitter(x) if x % 2 else None, 2)], threaded=threaded)
+    assert list(pipe) == list(range(1, 20, 2))
+    assert pipe.stats['odd'].dropped == 10
+
+
+def test_stage_error_is_raised():
+    def fail(x):
+        if x == 5:
+            raise ValueError('bad frame')
+        return x
+
+    with pytest.raises(ValueError, match='bad frame'):
+        list(Pipeline(range(100), [('f', fail, 1)]))
+
+
+def test_queue_drop_oldest():
+    dropped = []
+    q = StageQueue(maxsize=2, policy='drop', on_drop=dropped.append)
+    for x in range(5):
+        q.put(x)  # never blocks
+    q.close()
+    assert dropped == [0, 1, 2]
+    assert [q.get(), q.get(), q.get()] == [3, 4, _END]
+
+
+def test_queue_block_waits_for_space():
+    q = StageQueue(maxsize=1, policy='block')
+    q.put(0)
+    t = threading.Thread(target=q.put, args=(1,))
+    t.start()
+    t.join(0.05)
+    assert t.is_alive()  # full, producer blocked
+    assert q.get() == 0
+    t.join(1)
+    assert not t.is_alive() and q.get() == 1
+
+
+def test_queue_abort_wakes_consumer():
+    q = StageQueue()
+    threading.Timer(0.05, q.abort).start()
+    assert q.get() is _END
+    with pytest.raises(AssertionError):
+        StageQueue(policy='newest')
@@ -0,0 +1,58 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Preprocessing tests
+"""
+
+import numpy as np
+import pytest
+import torch
+
+from utils.augmentations import letterbox
+from utils.preprocess import Letterbox, Preprocessor
+
+
+def reference(im0, size=640, auto=True):
+    # The model input detect.py builds from letterbox(): (3,h,w) RGB uint8
+    return letterbox(im0, size, stride=32, auto=auto)[0].transpose((2, 0, 1))[::-1]
+
+
+def frames(*shapes, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (*s, 3), dtype=np.uint8) for s in shapes]
+
+
+@pytest.mark.parametrize('shape', [(480, 640), (720, 1280), (640, 640), (100, 50)])
+@pytest.mark.parametrize('auto', [True, False])
+def test_letterbox_matches_letterbox(shape, auto):
+    lb = Letterbox(640, stride=32, auto=auto)
+    for im0 in frames(shape, shape, seed=1):  # second frame reuses the cached canvas
+        np.testing.assert_array_equal(lb(im0), reference(im0, auto=auto))
+
+
+def test_letterbox_batch_and_buffers():
+    lb = Letterbox(320, stride=32, buffers=2)
+    ims = frames((240, 320), (240, 320), (240, 320))
+    out = lb.batch(ims)
+    assert out.shape == (3, 3, 256, 320)
+    for x, im0 in zip(out, ims):
+        np.testing.assert_array_equal(x, reference(im0, 320))
+    a, b, c = lb(ims[0]), lb(ims[1]), lb(ims[2])
+    assert a is not b and a is c  # round-robin over 2 buffers
+
+
+def test_letterbox_cache_is_bounded():
+    lb = Letterbox(320, cache=2)
+    for im0 in frames((100, 100), (200, 100), (100, 200)):
+        lb(im0)
+    assert list(lb.canvas) == [(200, 100), (100, 200)]
+
+
+@pytest.mark.parametrize('shapes', [[(480, 640)] * 3, [(480, 640), (720, 1280)], [(640, 640)]])
+def test_preprocessor_matches_letterbox(shapes):
+    ims = frames(*shapes)
+    im = Preprocessor(640, stride=32)(ims)
+    h, w = im.shape[2:]
+    assert im.dtype == torch.float32 and im.shape[:2] == (len(ims), 3)
+    for x, im0 in zip(im, ims):
+        y = reference(im0, (h, w), auto=len(set(shapes)) == 1)  # mixed shapes share the full img_size
+        assert np.abs(x.numpy() - y / 255).max() <= 1 / 255 + 1e-6  # rounding of the uint8 resize
@@ -0,0 +1,51 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Qt presentation tests
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('PyQt5')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')  # no display needed
+
+from PyQt5.QtWidgets import QApplication, QLabel  # noqa: E402
+
+from utils.qt import BGR888, show_frame, to_qimage  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def pixel(q, x, y):
+    c = q.pixelColor(x, y)
+    return c.blue(), c.green(), c.red()
+
+
+@pytest.mark.parametrize('w', [64, 63])  # rows padded to 4 bytes by Qt by default, not here
+def test_to_qimage(w):
+    im = np.random.default_rng(0).integers(0, 256, (20, w, 3), dtype=np.uint8)
+    q = to_qimage(im)
+    assert (q.width(), q.height()) == (w, 20)
+    assert pixel(q, 0, 0) == tuple(im[0, 0]) and pixel(q, w - 1, 19) == tuple(im[19, w - 1])
+    if BGR888 is not None:
+        assert q.buffer is im and int(q.constBits()) == im.ctypes.data  # borrowed, not copied
+
+
+def test_to_qimage_views_and_gray():
+    im = np.random.default_rng(0).integers(0, 256, (20, 30, 3), dtype=np.uint8)
+    q = to_qimage(im[5:15, 10:20])  # strided view, made contiguous
+    assert pixel(q, 0, 0) == tuple(im[5, 10])
+    gray = to_qimage(im[..., 0].copy())
+    assert gray.pixelColor(3, 4).red() == im[4, 3, 0]
+
+
+def test_show_frame(app):
+    label = QLabel()
+    label.resize(100, 100)
+    show_frame(label, np.zeros((50, 200, 3), np.uint8))
+    assert label.pixmap().width() == 100 and label.pixmap().height() == 25  # aspect ratio kept
@@ -0,0 +1,77 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Real-time scheduling tests
+"""
+
+import numpy as np
+
+from utils.scheduler import DROP, INFER, REUSE, TRACK, FrameScheduler, MotionGate
+
+
+def test_target_fps_reuses_between_inferences():
+    sched = FrameScheduler(target_fps=8)
+    t = 100 + np.arange(32) / 32  # 32 FPS camera for 1 s
+    actions = [sched.decide(t0, now=t0) for t0 in t]
+    assert actions == [INFER, REUSE, REUSE, REUSE] * 8
+
+
+def test_no_detections_forces_inference():
+    sched = FrameScheduler(target_fps=1)
+    assert sched.decide(100, now=100) == INFER
+    assert sched.decide(100.1, now=100.1) == REUSE
+    assert sched.decide(100.2, can_reuse=False, now=100.2) == INFER
+
+
+def test_latency_budget():
+    sched = FrameScheduler(max_latency=0.2)
+    assert sched.decide(100, now=100.3) == DROP  # already older than the budget
+    assert sched.decide(100, now=100.05) == INFER
+    sched.done(INFER, 100, 100.05, now=100.2)  # inference takes 0.15 s
+    assert sched.decide(100.14, now=100.2) == REUSE  # 0.06 s old + 0.15 s inference would miss the budget
+    assert sched.decide(100.25, now=100.3) == INFER  # last detections now older than the budget
+
+
+def test_stats():
+    sched = FrameScheduler(target_fps=5)
+    for i in range(10):
+        t0 = 100 + i / 10
+        action = sched.decide(t0, now=t0)
+        sched.done(action, t0, t0, now=t0 + 0.05)
+    sched.decide(101, now=102)
+    sched.counts[DROP] += 1
+    assert sched.counts == {INFER: 5, REUSE: 5, DROP: 1, TRACK: 0}
+    assert abs(sched.fps - 10) < 1e-6 and abs(sched.skip_ratio - 6 / 11) < 1e-6
+    np.testing.assert_allclose(sched.percentiles((50,)), [0.05])
+    assert '10.0 FPS' in str(sched) and '5 inferred, 0 tracked, 5 reused, 1 dropped' in str(sched)
+
+
+def test_tracked_frames():
+    # A tracker turns some INFER decisions into TRACK, they are shown frames without inference
+    sched = FrameScheduler(max_latency=1)
+    for i, action in enumerate([INFER, TRACK, TRACK, INFER]):
+        t0 = 100 + i / 10
+        sched.decide(t0, now=t0)
+        sched.done(action, t0, t0, now=t0 + 0.05)
+    assert sched.counts[TRACK] == 2 and abs(sched.fps - 10) < 1e-6 and sched.skip_ratio == 0.5
+    assert '2 inferred, 2 tracked' in str(sched)
+
+
+def test_motion_gate():
+    gate = MotionGate(threshold=0.01, refresh=5)
+    im = np.full((240, 320, 3), 100, np.uint8)
+    moved = im.copy()
+    moved[100:160, 100:180] = 255  # object enters
+    assert gate(im) == INFER  # no reference yet
+    assert gate(im.copy()) == REUSE
+    assert gate(im, can_reuse=False) == INFER
+    assert [gate(im) for _ in range(5)] == [REUSE] * 4 + [INFER]  # forced refresh
+    assert gate(moved) == INFER and gate(moved) == REUSE
+    assert gate([moved, im]) == INFER  # a new stream has no reference
+    assert gate.inferred == 5 and gate.gated == 6 and '5 inferred, 6 gated' in str(gate)
+
+
+def test_motion_gate_ignores_noise():
+    gate = MotionGate(threshold=0.01)
+    im = np.full((240, 320, 3), 100, np.uint8)
+    noisy = (im + np.random.default_rng(0).integers(-10, 11, im.shape)).astype(np.uint8)
+    assert gate(im) == INFER and gate(noisy) == REUSE
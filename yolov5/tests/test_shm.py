@@ -0,0 +1,75 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Shared-memory frame transport tests
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+from utils.shm import FrameRing
+
+
+@pytest.fixture
+def rings():
+    # Writer ring and a reader attached by name holding its last 2 frames, as in separate processes
+    cond = threading.Condition()
+    writer = FrameRing.create((4, 6, 3), slots=4, cond=cond)
+    reader = FrameRing(writer.name, cond, hold=2)
+    yield writer, reader
+    reader.close()
+    writer.close()
+
+
+def frame(v, shape=(4, 6, 3)):
+    return np.full(shape, v, np.uint8)
+
+
+def test_newest_frame(rings):
+    writer, reader = rings
+    with reader.cond:
+        assert reader.take() == (0, None)  # nothing written yet
+    for v in range(1, 4):
+        assert writer.write(frame(v))
+    with reader.cond:
+        seq, im = reader.take()
+    assert seq == reader.seq == 3 and (im == 3).all() and reader.shape == (4, 6, 3)
+
+
+def test_pinned_frames_are_not_overwritten(rings):
+    writer, reader = rings
+    views = []
+    for v in range(1, 3):
+        writer.write(frame(v))
+        with reader.cond:
+            views.append(reader.take()[1])
+    for v in range(3, 20):
+        writer.write(frame(v))
+    assert [int(x[0, 0, 0]) for x in views] == [1, 2]  # the 2 held views are intact
+    with reader.cond:
+        reader.take()
+    for v in range(20, 30):
+        writer.write(frame(v))
+    assert int(views[1][0, 0, 0]) == 2 and int(views[0][0, 0, 0]) != 1  # oldest pin released by the 3rd take
+
+
+def test_full_ring_skips(rings):
+    writer, reader = rings
+    reader.hold = 3
+    for v in range(1, 4):  # pin 3 of 4 slots, the 4th is the newest
+        writer.write(frame(v))
+        with reader.cond:
+            reader.take()
+    writer.write(frame(4))
+    assert not writer.write(frame(5)) and writer.skipped == 1 and reader.seq == 4
+
+
+def test_resize_and_end(rings):
+    writer, reader = rings
+    writer.write(frame(7, (8, 12, 3)))  # source changed resolution
+    with reader.cond:
+        assert (reader.take()[1] == 7).all()
+    assert not reader.ended
+    writer.end()
+    assert reader.ended
@@ -0,0 +1,95 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Output sink tests
+"""
+
+import time
+
+import cv2
+import numpy as np
+import torch
+
+from utils.general import xyxy2xywh
+from utils.sinks import ImageWriter, VideoSink, label_rows
+
+
+def test_unique_names_reserved_before_write(tmp_path):
+    (tmp_path / 'crop.jpg').touch()  # on disk
+    writer = ImageWriter(workers=2, maxsize=8)
+    im = np.zeros((8, 8, 3), np.uint8)
+    files = [writer.write(tmp_path / 'crop.jpg', im, unique=True) for _ in range(3)]  # queued, not yet written
+    writer.close()
+    assert [f.name for f in files] == ['crop2.jpg', 'crop3.jpg', 'crop4.jpg']
+    assert all(f.exists() for f in files)
+    assert writer.written == 3 and writer.pending == 0 and not writer.reserved
+
+
+def test_overwrite_without_unique(tmp_path):
+    writer = ImageWriter()
+    im = np.zeros((8, 8, 3), np.uint8)
+    assert writer.write(tmp_path / 'a.jpg', im) == writer.write(tmp_path / 'a.jpg', im)
+    writer.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['a.jpg']
+
+
+def test_failed_write_counted(tmp_path):
+    (tmp_path / 'file').touch()
+    writer = ImageWriter()
+    writer.write(tmp_path / 'file' / 'im.jpg', np.zeros((8, 8, 3), np.uint8))  # parent is a file
+    writer.close()
+    assert writer.failed == 1 and writer.written == 0
+
+
+def video_info(file):
+    cap = cv2.VideoCapture(str(file))
+    info = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), cap.get(cv2.CAP_PROP_FPS), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    cap.release()
+    return info
+
+
+def test_video_sink_scaled(tmp_path):
+    sink = VideoSink(tmp_path / 'v.mp4', fps=25, size=(64, 48), scale=0.5)
+    for _ in range(10):
+        sink.write(np.zeros((48, 64, 3), np.uint8))
+    sink.close()
+    assert sink.written == 10 and sink.lag == 0
+    assert video_info(tmp_path / 'v.mp4') == (10, 25, 32)
+
+
+def test_video_sink_derives_fps_from_timestamps(tmp_path):
+    sink = VideoSink(tmp_path / 'v.mp4', fps=30, size=(64, 48), derive=True, probe=1.0)
+    for i in range(16):  # 16 frames over 3 s of source time, i.e. frames skipped at run time
+        sink.write(np.zeros((48, 64, 3), np.uint8), t=i * 0.2)
+    sink.close()
+    n, fps, _ = video_info(tmp_path / 'v.mp4')
+    assert sink.fps == fps == 5 and n == 16  # plays back in real time
+
+
+def test_video_sink_derive_falls_back(tmp_path):
+    sink = VideoSink(tmp_path / 'v.mp4', fps=30, size=(64, 48), derive=True)
+    sink.write(np.zeros((48, 64, 3), np.uint8), t=0.0)  # ended before the probe span, single frame
+    sink.close()
+    assert sink.fps == 30 and sink.written == 1
+
+
+def test_video_sink_derive_buffer_is_bounded(tmp_path):
+    # A long probe span with few frames written, i.e. --vid-det-only, opens once maxsize frames are buffered
+    sink = VideoSink(tmp_path / 'v.mp4', fps=30, size=(64, 48), maxsize=4, derive=True, probe=100)
+    for i in range(6):
+        sink.write(np.zeros((48, 64, 3), np.uint8), t=i * 0.1)
+    t = time.time()
+    while sink.written < 4 and time.time() - t < 10:  # encoded before close()
+        time.sleep(0.01)
+    assert sink.written >= 4 and abs(sink.fps - 10) < 1e-6
+    sink.close()
+    assert sink.written == 6
+
+
+def test_label_rows_match_per_box_format():
+    det = torch.tensor([[10., 20., 50., 80., 0.9, 3.], [0., 0., 640., 480., 0.25, 0.]])
+    gn = torch.tensor([640, 480, 640, 480])
+    expected = [('%g ' * 6).rstrip() % (cls, *(xyxy2xywh(torch.tensor(xyxy).view(1, 4)) / gn).view(-1).tolist(), conf)
+                for *xyxy, conf, cls in det.tolist()]  # detect.py per-box --save-txt --save-conf format
+    assert label_rows(det, gn, conf=True) == expected
+    assert label_rows(det, gn) == [' '.join(r.split()[:5]) for r in expected]
+    assert label_rows(det[:0], gn) == []
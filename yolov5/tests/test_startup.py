@@ -0,0 +1,43 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Startup tests
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+from utils.startup import StartupProfiler
+
+ROOT = Path(__file__).resolve().parents[1]  # YOLOv5 root directory
+
+
+def test_profiler_times_imports(tmp_path, monkeypatch):
+    (tmp_path / 'startup_outer.py').write_text('import time\nimport startup_inner\ntime.sleep(0.05)\n')
+    (tmp_path / 'startup_inner.py').write_text('import time\ntime.sleep(0.1)\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    startup = StartupProfiler()
+    try:
+        import startup_outer  # noqa: F401, an import statement as the profiled application uses
+        startup.mark('imported')
+    finally:
+        startup.stop()
+    (outer, outer_self), (inner, _) = startup.imports['startup_outer'], startup.imports['startup_inner']
+    assert inner >= 0.1 and outer_self >= 0.05 and outer_self <= outer - inner  # self time excludes startup_inner
+    s = startup.report()
+    assert s.index('startup_outer') < s.index('startup_inner') and 'imported' in s and 'MainThread' in s
+
+
+def test_disabled_profiler():
+    startup = StartupProfiler(enabled=False)
+    startup.mark('x')
+    assert startup.report() == '' and not startup.marks
+
+
+def test_detect_imports_helpers_lazily():
+    # Importing detect for DetectorSession must not pull in the run() helpers
+    code = 'import sys, detect; print(" ".join(sys.modules))'
+    modules = subprocess.check_output([sys.executable, '-c', code], cwd=ROOT, text=True).split()
+    assert 'detect' in modules
+    for m in 'utils.pipeline', 'utils.scheduler', 'utils.sinks', 'utils.tiles', 'utils.tracker', 'utils.workers':
+        assert m not in modules
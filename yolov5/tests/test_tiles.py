@@ -0,0 +1,74 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Sliced (tiled) and region-of-interest inference tests
+"""
+
+import numpy as np
+import pytest
+import torch
+
+from utils.control import DetectControl
+from utils.tiles import Tiler, clip_rois, merge, tile_starts
+
+
+@pytest.mark.parametrize('n, size, step, starts', [(500, 640, 512, [0]), (640, 640, 512, [0]),
+                                                   (1000, 640, 512, [0, 360]), (1920, 640, 512, [0, 512, 1024, 1280])])
+def test_tile_starts(n, size, step, starts):
+    assert tile_starts(n, size, step) == starts
+
+
+def test_tiles_cover_image():
+    im = np.random.default_rng(0).integers(0, 256, (1080, 1920, 3), dtype=np.uint8)
+    tiler = Tiler(640, overlap=0.2)
+    tiles, offsets = tiler(im)
+    assert tiles.shape == (8, 3, 640, 640) and offsets.tolist()[-1] == [1280, 440]
+    for t, (x, y) in zip(tiles, offsets):
+        np.testing.assert_array_equal(t, im[y:y + 640, x:x + 640].transpose((2, 0, 1))[::-1])
+
+
+def test_small_image_is_padded():
+    im = np.zeros((300, 800, 3), np.uint8)
+    tiles, offsets = Tiler(640, overlap=0.2, color=114)(im)
+    assert offsets.tolist() == [[0, 0], [160, 0]]
+    assert (tiles[:, :, :300] == 0).all() and (tiles[:, :, 300:] == 114).all()
+
+
+def test_merge_dedupes_across_tile_border():
+    # One object straddling the border of tiles at x=0 and x=512, seen by both, plus one object per tile
+    dets = [torch.tensor([[500., 100, 600, 200, 0.9, 0], [10, 10, 50, 50, 0.8, 0]]),
+            torch.tensor([[-12., 102, 88, 198, 0.7, 0], [300, 300, 340, 340, 0.6, 0], [-12, 102, 88, 198, 0.5, 1]])]
+    det = merge(dets, [(0, 0), (512, 0)], (720, 1280))
+    assert det[:, 4].tolist() == pytest.approx([0.9, 0.8, 0.6, 0.5])  # the weaker border duplicate is removed
+    assert det[1, :4].tolist() == [10, 10, 50, 50] and det[2, :4].tolist() == [812, 300, 852, 340]
+    assert det[3, :4].tolist() == [500, 102, 600, 198]  # other class kept, shifted into image pixels
+
+
+def test_merge_full_image_pass_and_clip():
+    full = torch.tensor([[495., 95, 605, 205, 0.95, 0], [1200, 700, 1300, 760, 0.4, 2]])
+    det = merge([torch.tensor([[500., 100, 600, 200, 0.9, 0]])], [(0, 0)], (720, 1280), full=full)
+    assert det[:, 4].tolist() == pytest.approx([0.95, 0.4])
+    assert det[1, :4].tolist() == [1200, 700, 1280, 720]  # clipped to the image
+    assert len(merge([], [], (720, 1280))) == 0
+
+
+def test_clip_rois():
+    rois = [[-20, -10, 100, 80], [600, 400, 900, 900], [10, 10, 15, 100], [700, 500, 650, 550]]
+    assert clip_rois(rois, (480, 640)) == [(0, 0, 100, 80), (600, 400, 640, 480)]  # too small and inverted removed
+
+
+def test_roi_detections_to_frame_pixels():
+    # Two ROIs overlapping on one object, detections come back in crop pixels
+    rois = clip_rois([[100, 100, 400, 300], [300, 100, 600, 300]], (480, 640))
+    dets = [torch.tensor([[210., 50, 290, 150, 0.9, 0]]), torch.tensor([[10., 52, 90, 148, 0.8, 0]])]
+    det = merge(dets, [r[:2] for r in rois], (480, 640))
+    assert det.tolist() == [pytest.approx([310, 150, 390, 250, 0.9, 0])]
+
+
+def test_control_rois():
+    control = DetectControl()
+    assert control.rois() == []
+    control.add_roi([1.5, 2, 30, 40])
+    control.set_rois([[0, 0, 10, 10]], source=1)
+    assert control.rois(0) == [[1, 2, 30, 40]] and control.rois(1) == [[0, 0, 10, 10]]  # all sources, then own
+    control.clear_rois()
+    assert control.rois(0) == control.rois(1) == []
@@ -0,0 +1,72 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Multi-object tracking tests
+"""
+
+import numpy as np
+import pytest
+
+from utils.tracker import Sort, iou_matrix, xyxy2z, z2xyxy
+
+pytest.importorskip('scipy')
+
+
+def boxes(t):
+    # Two objects of different classes moving right 10 px per frame, [xyxy, conf, cls]
+    return np.array([[100 + 10 * t, 100, 150 + 10 * t, 200, 0.9, 0],
+                     [400 - 10 * t, 300, 480 - 10 * t, 340, 0.8, 1]], dtype=float)
+
+
+def test_box_conversions():
+    x = boxes(0)[:, :4]
+    np.testing.assert_allclose(z2xyxy(xyxy2z(x)), x)
+    np.testing.assert_allclose(iou_matrix(x, x), np.eye(2), atol=1e-6)
+    np.testing.assert_allclose(iou_matrix(x[:1], x[:1] + [25, 0, 25, 0]), [[1 / 3]], atol=1e-6)
+
+
+def test_ids_persist():
+    tracker = Sort(max_age=3, min_hits=2)
+    for t in range(10):
+        tracks = tracker.update(boxes(t))
+        assert len(tracks) == 2 and sorted(tracks[:, 6]) == [1, 2]
+        for det in boxes(t):
+            tr = tracks[tracks[:, 5] == det[5]][0]
+            assert iou_matrix(tr[None, :4], det[None, :4])[0, 0] > 0.9
+    assert tracker.next_id == 3 and str(tracker) == '2 tracks, 2 ids, 10 keyframes'
+
+
+def test_step_predicts_motion():
+    tracker = Sort()
+    for t in range(10):
+        tracker.update(boxes(t))
+    tracks = tracker.step()  # frame 10 without a detection
+    np.testing.assert_allclose(tracks[:, :4], boxes(10)[:, :4], atol=3)
+
+
+def test_classes_do_not_match():
+    tracker = Sort(min_hits=1)
+    tracker.update(boxes(0)[:1])
+    det = boxes(0)[:1]
+    det[0, 5] = 1  # same box, other class
+    tracks = tracker.update(det)
+    assert tracks[:, 6].tolist() == [2]
+
+
+def test_lost_tracks_are_dropped():
+    tracker = Sort(max_age=2, min_hits=1)
+    tracker.update(boxes(0))
+    for _ in range(2):
+        assert len(tracker.update(boxes(0)[:1])) == 1 and len(tracker) == 2  # unmatched, not confirmed
+    tracker.update(boxes(0)[:1])
+    assert len(tracker) == 1
+    assert tracker.update(boxes(0))[:, 6].tolist() == [1, 3]  # new id once lost
+
+
+def test_uncertain_after_coasting():
+    tracker = Sort(max_std=0.2)
+    for t in range(5):
+        tracker.update(boxes(t))
+    assert not tracker.uncertain()
+    for _ in range(50):
+        tracker.step()
+    assert tracker.uncertain()
@@ -0,0 +1,88 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Multi-process inference tests
+"""
+
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from utils.workers import WorkerPool
+
+IMGSZ = (128, 128)
+
+
+@pytest.fixture(scope='module')
+def pool(weights):
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv('TORCH_FORCE_NO_WEIGHTS_ONLY_LOAD', '1')  # full checkpoint pickles, inherited by the workers
+        pool = WorkerPool(weights, workers=2, threads=1, timeout=30, imgsz=IMGSZ, conf_thres=1e-6, max_det=10)
+    yield pool
+    pool.close()
+
+
+def images(n):
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, (96 + 16 * i, 128, 3), dtype=np.uint8) for i in range(n)]
+
+
+def test_pool_matches_session(pool, weights, monkeypatch):
+    from detect import DetectorSession
+
+    monkeypatch.setenv('TORCH_FORCE_NO_WEIGHTS_ONLY_LOAD', '1')
+    session = DetectorSession(weights, device='cpu')
+    ims = images(6)
+    dets = pool.infer(ims)  # in order, spread over the workers
+    assert sum(len(det) for det in dets)  # untrained, but not empty
+    for det, im in zip(dets, ims):
+        ref = session.infer(im, imgsz=IMGSZ, conf_thres=1e-6, max_det=10)[0].numpy()
+        np.testing.assert_allclose(det, ref, atol=1e-3)
+    assert sum(pool.stats()['tasks']) == 6 and len(pool.names) == 80
+
+
+def test_slots_bound_in_flight_frames(pool):
+    futures = [pool.submit(im) for im in images(len(pool.shms) + 2)]  # more frames than shared memory slots
+    assert all(f.result(30).shape[1] == 6 for f in futures)
+    assert sorted(pool.free) == list(range(len(pool.shms)))
+
+
+def test_dead_worker_breaks_pool(weights, monkeypatch):
+    monkeypatch.setenv('TORCH_FORCE_NO_WEIGHTS_ONLY_LOAD', '1')
+    pool = WorkerPool(weights, workers=1, threads=1, timeout=30, imgsz=IMGSZ)
+    try:
+        pool.procs[0].kill()
+        with pytest.raises(RuntimeError, match='inference worker 0 exited'):
+            pool.infer(images(2))
+        assert pool.broken is not None
+    finally:
+        pool.close()
+
+
+def test_cancelled_future_keeps_pool_running(pool):
+    future = pool.submit(images(1)[0])
+    assert future.cancel()  # i.e. asyncio.wait_for() timed out, the worker still returns a result later
+    t = time.time()
+    while len(pool.free) < len(pool.shms) and time.time() - t < 30:
+        time.sleep(0.01)
+    assert sorted(pool.free) == list(range(len(pool.shms)))  # slot freed
+    assert pool.collector.is_alive() and len(pool.infer(images(2))) == 2
+
+
+def test_server_loop_not_blocked_by_full_pool(pool):
+    # More concurrent requests than shared memory slots, the event loop must keep running meanwhile
+    make_app = pytest.importorskip('utils.flask_rest_api.asyncapi').make_app
+    batcher = make_app(None, pool=pool)[1]
+    ims = images(1) * (len(pool.shms) * 3)
+
+    async def main():
+        gaps, done = [], asyncio.gather(*(batcher(im) for im in ims))
+        while not done.done():
+            t = time.time()
+            await asyncio.sleep(0.01)
+            gaps.append(time.time() - t)
+        return await done, max(gaps)
+
+    dets, gap = asyncio.run(main())
+    assert len(dets) == len(ims) and gap < 0.2
@@ -88,6 +88,20 @@ def replicate(im, labels):
     return im, labels
 
 
+def letterbox_shape(shape, new_shape=(640, 640), auto=True, scaleup=True, stride=32):
+    # Output [height, width] of letterbox() for an input of shape [height, width], without resizing anything
+    if isinstance(new_shape, int):
+        new_shape = (new_shape, new_shape)
+    r = min(new_shape[0] / shape[0], new_shape[1] / shape[1])
+    if not scaleup:
+        r = min(r, 1.0)
+    new_unpad = int(round(shape[1] * r)), int(round(shape[0] * r))
+    dw, dh = new_shape[1] - new_unpad[0], new_shape[0] - new_unpad[1]  # wh padding
+    if auto:  # minimum rectangle
+        dw, dh = np.mod(dw, stride), np.mod(dh, stride)
+    return new_unpad[1] + int(dh), new_unpad[0] + int(dw)
+
+
 def letterbox(im, new_shape=(640, 640), color=(114, 114, 114), auto=True, scaleFill=False, scaleup=True, stride=32):
     # Resize and pad image while meeting stride-multiple constraints
     shape = im.shape[:2]  # current shape [height, width]
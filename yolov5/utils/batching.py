@@ -0,0 +1,72 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Micro-batching utils
+"""
+
+import asyncio
+
+
+class MicroBatcher:
+    # Collect concurrent asyncio callers into batches for one blocking batched call on an executor thread
+    # Usage:
+    #   batcher = MicroBatcher(session.infer, max_batch=8, max_wait=0.005)  # fn(list of items) -> list of results
+    #   det = await batcher(im)  # inside a coroutine, resolves with this item's result from the batched call
+    # A batch is sent once max_batch items are waiting or max_wait seconds after its first item. Items arriving while a
+    # batch runs queue up for the next one, so batches grow with load without adding latency when idle
+    def __init__(self, fn, max_batch=8, max_wait=0.005, executor=None):
+        self.fn, self.max_batch, self.max_wait, self.executor = fn, max_batch, max_wait, executor
+        self.queue = None  # asyncio.Queue of (item, future), created on the serving event loop
+        self.task = None
+        self.batches, self.items, self.max_seen = 0, 0, 0
+
+    async def __call__(self, x):
+        if self.task is None:
+            self.queue = asyncio.Queue()
+            self.task = asyncio.ensure_future(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((x, future))
+        return await future
+
+    def stats(self):
+        return {'batches': self.batches, 'items': self.items, 'max_batch': self.max_seen}
+
+    def __str__(self):
+        return f'{self.items} items in {self.batches} batches, mean batch {self.items / max(self.batches, 1):.2f}, ' \
+               f'max batch {self.max_seen}'
+
+    async def _collect(self):
+        # Wait for a first item, then up to max_wait for the batch to fill
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            items, futures = zip(*batch)
+            try:
+                results = await loop.run_in_executor(self.executor, self.fn, list(items))
+            except Exception as e:
+                for f in futures:
+                    if not f.done():
+                        f.set_exception(e)
+            else:
+                for f, r in zip(futures, results):
+                    if not f.done():  # caller may have gone away
+                        f.set_result(r)
+            self.batches += 1
+            self.items += len(batch)
+            self.max_seen = max(self.max_seen, len(batch))
@@ -0,0 +1,64 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Class metadata utils
+"""
+
+from pathlib import Path
+
+import numpy as np
+import torch
+import yaml
+
+
+class ClassMeta:
+    # Integer-indexed class metadata (category id, display name) built once from data.yaml 'categories'
+    # Usage: meta = ClassMeta.from_yaml(model.names, 'data/waste.yaml'); text = meta.text(meta.classes(det[:, -1]))
+    #        counts = meta.category_histogram(det[:, -1])  # per-frame detections per category, for the log line
+    header = '可能存在如下垃圾，请及时处理！\n'
+
+    def __init__(self, names, categories=None):
+        categories = categories or {}  # {class name: [category, display name]}
+        self.names = list(names)
+        self.nc = len(self.names)
+        self.categories = list(dict.fromkeys(v[0] for v in categories.values()))  # category names, file order
+        cid = {c: i for i, c in enumerate(self.categories)}
+        self.category = np.array([cid[categories[n][0]] if n in categories else -1 for n in self.names], dtype=int)
+        self.display = [categories[n][1] if n in categories else n for n in self.names]  # display names
+
+    @classmethod
+    def from_yaml(cls, names, file=None):
+        # Load 'categories' from a data.yaml if present, empty table otherwise
+        categories = {}
+        if file and Path(file).is_file():
+            with open(file, encoding='utf-8', errors='ignore') as f:
+                categories = (yaml.safe_load(f) or {}).get('categories') or {}
+        return cls(names, categories)
+
+    def __bool__(self):
+        return bool(self.categories)
+
+    @staticmethod
+    def _ids(cls):
+        # det[:, -1] tensor or array to numpy int class indices
+        return np.asarray(cls.cpu() if isinstance(cls, torch.Tensor) else cls).astype(int)
+
+    def histogram(self, cls):
+        # Per-class detection counts from det[:, -1], shape(nc)
+        return np.bincount(self._ids(cls), minlength=self.nc)
+
+    def category_histogram(self, cls):
+        # Per-category detection counts from det[:, -1], shape(len(categories)), classes without metadata ignored
+        c = self.category[self._ids(cls)]
+        return np.bincount(c[c >= 0], minlength=len(self.categories))
+
+    def classes(self, cls):
+        # Set of detected class indices from det[:, -1], used for change detection
+        return frozenset(np.unique(self._ids(cls)).tolist())
+
+    def text(self, classes):
+        # Waste-category summary for a set of class indices, or a {class index: distinct objects} dict when tracking.
+        # None if no class has metadata
+        n = classes if isinstance(classes, dict) else {}
+        lines = [f'{self.display[c]}{f"（{n[c]}个）" if c in n else ""}，该垃圾应当是：'
+                 f'{self.categories[self.category[c]]}\n' for c in sorted(classes) if self.category[c] >= 0]
+        return self.header + ''.join(lines) if lines else None
@@ -0,0 +1,108 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Run-control utils
+"""
+
+import threading
+from pathlib import Path
+
+
+class DetectControl:
+    # Thread-safe control channel between a GUI and a running detect.run() loop, polled per frame without any I/O
+    # Usage: control = DetectControl(save_path='D:/'); detect.run(source=0, control=control); control.stop()
+    # A stop stays set until reset(), call it before starting a new run with the same control
+    def __init__(self, save_path=''):
+        self._running = threading.Event()  # set while a run() loop owns this control
+        self._stop = threading.Event()  # request run() to finish
+        self._resume = threading.Event()  # cleared while paused
+        self._snapshot = threading.Event()  # save every 10th annotated frame to save_path
+        self._resume.set()
+        self._lock = threading.Lock()
+        self._save_path = str(save_path or '')
+        self._rois = {}  # {source index, None for all sources: [[x1, y1, x2, y2], ...] in frame pixels}
+
+    @property
+    def running(self):
+        return self._running.is_set()
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    @property
+    def paused(self):
+        return not self._resume.is_set()
+
+    @property
+    def snapshot(self):
+        return self._snapshot.is_set()
+
+    @property
+    def save_path(self):
+        with self._lock:
+            return self._save_path
+
+    def start(self):
+        # Called by run() when its loop starts, a stop requested before this is kept
+        self._running.set()
+
+    def reset(self):
+        # Clear a previous stop and pause for a new run
+        self._stop.clear()
+        self._resume.set()
+
+    def finish(self):
+        # Called by run() when its loop exits
+        self._running.clear()
+
+    def stop(self):
+        self._stop.set()
+        self._resume.set()  # wake a paused loop so it can exit
+
+    def pause(self):
+        self._resume.clear()
+
+    def resume(self):
+        self._resume.set()
+
+    def wait(self, timeout=None):
+        # Block while paused, return False if a stop was requested
+        self._resume.wait(timeout)
+        return not self.stopped
+
+    def set_snapshot(self, on=True):
+        self._snapshot.set() if on else self._snapshot.clear()
+
+    def toggle_snapshot(self):
+        # Flip snapshot mode, return new state
+        on = not self.snapshot
+        self.set_snapshot(on)
+        return on
+
+    def set_save_path(self, path):
+        with self._lock:
+            self._save_path = str(path or '')
+
+    def rois(self, i=0):
+        # Regions of interest for source i, [] to run the whole frame
+        with self._lock:
+            return list(self._rois.get(i, self._rois.get(None, [])))
+
+    def set_rois(self, rois, source=None):
+        # Replace the ROIs of one source (None for all sources), picked up from the next frame on
+        with self._lock:
+            self._rois[source] = [[int(x) for x in r] for r in rois or []]
+
+    def add_roi(self, roi, source=None):
+        with self._lock:
+            self._rois.setdefault(source, []).append([int(x) for x in roi])
+
+    def clear_rois(self):
+        with self._lock:
+            self._rois.clear()
+
+    def snapshot_file(self, n):
+        # Return snapshot path for frame index n (every 10th frame), or None if snapshots are off
+        save_path = self.save_path
+        if self.snapshot and save_path and n % 10 == 0:
+            return str(Path(save_path) / f'{n // 10:06d}.jpg')
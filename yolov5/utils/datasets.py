@@ -7,14 +7,17 @@ import glob
 import hashlib
 import json
 import math
+import multiprocessing as mp
 import os
+import queue
 import random
 import shutil
 import time
+from collections import deque
 from itertools import repeat
 from multiprocessing.pool import Pool, ThreadPool
 from pathlib import Path
-from threading import Thread
+from threading import Condition, Thread
 from zipfile import ZipFile
 
 import cv2
@@ -26,9 +29,12 @@ from PIL import ExifTags, Image, ImageOps
 from torch.utils.data import DataLoader, Dataset, dataloader, distributed
 from tqdm import tqdm
 
-from utils.augmentations import Albumentations, augment_hsv, copy_paste, letterbox, mixup, random_perspective
+from utils.augmentations import (Albumentations, augment_hsv, copy_paste, letterbox, letterbox_shape, mixup,
+                                 random_perspective)
 from utils.general import (DATASETS_DIR, LOGGER, NUM_THREADS, check_dataset, check_requirements, check_yaml, clean_str,
                            segments2boxes, xyn2xy, xywh2xyxy, xywhn2xyxy, xyxy2xywhn)
+from utils.preprocess import Letterbox
+from utils.shm import FrameRing, capture
 from utils.torch_utils import torch_distributed_zero_first
 
 # Remap
@@ -159,9 +165,73 @@ class _RepeatSampler:
             yield from iter(self.sampler)
 
 
+class VideoDecoder:
+    # Decodes a video file on a daemon thread ahead of inference into a small ring buffer of (frame number, image)
+    # stride=N retrieves frame 1 and every Nth frame after it (1, N+1, 2N+1...), skipping the others with cap.grab()
+    # latest=True plays the video back at its own FPS and keeps only the newest frame, as for a live stream
+    def __init__(self, cap, buffer=4, stride=1, latest=False):
+        self.cap, self.stride, self.latest = cap, max(int(stride), 1), latest
+        fps = cap.get(cv2.CAP_PROP_FPS)  # warning: may return 0 or nan
+        self.fps = max((fps if math.isfinite(fps) else 0) % 100, 0) or 30  # 30 FPS fallback
+        self.buffer = deque(maxlen=1 if latest else max(int(buffer), 1))
+        self.cond = Condition()
+        self.done = False  # end of video or closed
+        self.skipped = 0  # retrieved frames replaced before being read, latest=True only
+        self.thread = Thread(target=self.update, daemon=True)
+        self.thread.start()
+
+    def update(self):
+        n, t0 = 0, time.time()  # frame number, playback start
+        while not self.done:
+            for _ in range(self.stride - 1 if n else 0):  # first frame always analysed
+                if not self.cap.grab():
+                    break
+                n += 1
+            if not self.cap.grab():
+                break
+            n += 1
+            success, im = self.cap.retrieve()
+            if not success:
+                break
+            with self.cond:
+                if self.latest:
+                    self.skipped += len(self.buffer)
+                while len(self.buffer) == self.buffer.maxlen and not self.latest and not self.done:
+                    self.cond.wait()
+                self.buffer.append((n, im))
+                self.cond.notify_all()
+            if self.latest:
+                time.sleep(max(t0 + n / self.fps - time.time(), 0))  # real-time pacing
+        with self.cond:
+            self.done = True
+            self.cond.notify_all()
+
+    def read(self):
+        # Return next (frame number, image), None at end of video
+        with self.cond:
+            self.cond.wait_for(lambda: self.buffer or self.done)
+            x = self.buffer.popleft() if self.buffer else None
+            self.cond.notify_all()
+            return x
+
+    def close(self):
+        with self.cond:
+            self.done = True
+            self.cond.notify_all()
+        self.thread.join()
+
+
 class LoadImages:
     # YOLOv5 image/video dataloader, i.e. `python detect.py --source image.jpg/vid.mp4`
-    def __init__(self, path, img_size=640, stride=32, auto=True):
+    # With batch_size > 1 images are returned as lists with a (n,3,h,w) batch, grouped by letterboxed shape so that
+    # batching adds no extra padding. Videos are always returned one frame at a time after all images.
+    # With prefetch > 0 up to prefetch upcoming images are decoded and letterboxed ahead, in order, on a thread pool
+    # that is shut down by close(), called at the end of iteration.
+    # Videos are decoded on a VideoDecoder thread, every vid_stride-th frame, or the newest frame if vid_latest.
+    # With raw=True the original BGR frames are returned in place of the letterboxed input, i.e. for a Preprocessor
+    # reuse_buffers > 0 letterboxes video frames into that many persistent buffers reused round-robin
+    def __init__(self, path, img_size=640, stride=32, auto=True, batch_size=1, prefetch=0, vid_stride=1,
+                 vid_latest=False, vid_buffer=4, raw=False, reuse_buffers=0):
         p = str(Path(path).resolve())  # os-agnostic absolute path
         if '*' in p:
             files = sorted(glob.glob(p, recursive=True))  # glob
@@ -183,6 +253,17 @@ class LoadImages:
         self.video_flag = [False] * ni + [True] * nv
         self.mode = 'image'
         self.auto = auto
+        self.batch_size = max(int(batch_size), 1)
+        self.batches = self.bucket(images) if self.batch_size > 1 else []  # lists of image indices
+        self.order = [i for b in self.batches for i in b] if self.batches else list(range(ni))  # image read order
+        self.prefetch = max(int(prefetch), 0)  # read-ahead window, images
+        self.pool = None  # prefetch ThreadPool, started by __iter__()
+        self.window, self.ahead = {}, 0  # {image index: AsyncResult}, next self.order position to submit
+        self.decoded, self.decode_time = 0, 0.0  # images read, total imread + letterbox seconds (on any thread)
+        self.vid_stride, self.vid_latest, self.vid_buffer = vid_stride, vid_latest, vid_buffer
+        self.raw = raw
+        self.lb = Letterbox(img_size, stride, auto, buffers=reuse_buffers) if reuse_buffers and not raw else None
+        self.analysed = {}  # {video path: [analysed frame numbers]}
         if any(videos):
             self.new_video(videos[0])  # new video
         else:
@@ -192,50 +273,133 @@ class LoadImages:
 
     def __iter__(self):
         self.count = 0
+        self.batch = 0  # batches returned
+        self.window, self.ahead = {}, 0
+        if self.prefetch and not self.pool:
+            self.pool = ThreadPool(min(self.prefetch, NUM_THREADS))
         return self
 
     def __next__(self):
+        if self.batch < len(self.batches):
+            return self.next_batch()
         if self.count == self.nf:
+            self.close()
             raise StopIteration
         path = self.files[self.count]
 
         if self.video_flag[self.count]:
             # Read video
             self.mode = 'video'
-            ret_val, img0 = self.cap.read()
-            while not ret_val:
+            x = self.decoder.read()
+            while x is None:
                 self.count += 1
+                self.decoder.close()
                 self.cap.release()
                 if self.count == self.nf:  # last video
+                    self.close()
                     raise StopIteration
                 else:
                     path = self.files[self.count]
                     self.new_video(path)
-                    ret_val, img0 = self.cap.read()
+                    x = self.decoder.read()
 
-            self.frame += 1
+            self.frame, img0 = x
+            self.analysed.setdefault(path, []).append(self.frame)
             s = f'video {self.count + 1}/{self.nf} ({self.frame}/{self.frames}) {path}: '
 
+            # Padded resize
+            if self.lb:  # cached geometry, into a reused CHW RGB buffer
+                return path, self.lb(img0), img0, self.cap, s
+            img = img0 if self.raw else letterbox(img0, self.img_size, stride=self.stride, auto=self.auto)[0]
+
         else:
             # Read image
+            img, img0 = self.load(self.count)
             self.count += 1
-            img0 = cv2.imread(path)  # BGR
-            assert img0 is not None, f'Image Not Found {path}'
             s = f'image {self.count}/{self.nf} {path}: '
 
-        # Padded resize
-        img = letterbox(img0, self.img_size, stride=self.stride, auto=self.auto)[0]
-
         # Convert
-        img = img.transpose((2, 0, 1))[::-1]  # HWC to CHW, BGR to RGB
-        img = np.ascontiguousarray(img)
+        if not self.raw:
+            img = img.transpose((2, 0, 1))[::-1]  # HWC to CHW, BGR to RGB
+            img = np.ascontiguousarray(img)
 
         return path, img, img0, self.cap, s
 
+    def bucket(self, files):
+        # Group image indices into batches of identical letterbox() output shape, shapes read from image headers
+        buckets = {}
+        for i, f in enumerate(files):
+            try:
+                w, h = exif_size(Image.open(f))
+                shape = letterbox_shape((h, w), self.img_size, auto=self.auto, stride=self.stride)
+            except Exception:
+                shape = None  # unreadable header, batched alone and reported on load
+            buckets.setdefault(shape, []).append(i)
+        n = self.batch_size
+        return [b[j:j + n] for b in buckets.values() for j in range(0, len(b), n)]
+
+    def next_batch(self):
+        # Read, letterbox and stack the next image batch
+        index = self.batches[self.batch]
+        self.batch += 1
+        self.count += len(index)
+        self.mode = 'image'
+        paths, imgs, img0s = [], [], []
+        for i in index:
+            path = self.files[i]
+            img, img0 = self.load(i)
+            if imgs and img.shape != imgs[0].shape and not self.raw:  # header shape mismatch, i.e. EXIF orientation
+                img = letterbox(img0, imgs[0].shape[:2], stride=self.stride, auto=False)[0]
+            paths.append(path)
+            imgs.append(img)
+            img0s.append(img0)
+        if not self.raw:
+            img = np.ascontiguousarray(np.stack(imgs).transpose((0, 3, 1, 2))[:, ::-1])  # BHWC to BCHW, BGR to RGB
+        s = f'batch {self.batch}/{len(self.batches)} ({self.count}/{self.nf} files) '
+        return paths, img0s if self.raw else img, img0s, None, s
+
+    def read(self, i):
+        # Read and letterbox image i, timed. Runs on the prefetch pool when enabled
+        t = time.time()
+        path = self.files[i]
+        img0 = cv2.imread(path)  # BGR
+        assert img0 is not None, f'Image Not Found {path}'
+        img = img0 if self.raw else letterbox(img0, self.img_size, stride=self.stride, auto=self.auto)[0]
+        return img, img0, time.time() - t
+
+    def load(self, i):
+        # Return letterboxed and original image i, from the read-ahead window when prefetching
+        if self.pool:
+            while len(self.window) < self.prefetch and self.ahead < len(self.order):  # top up the window
+                j = self.order[self.ahead]
+                self.window[j] = self.pool.apply_async(self.read, (j,))
+                self.ahead += 1
+            img, img0, dt = self.window.pop(i).get() if i in self.window else self.read(i)
+        else:
+            img, img0, dt = self.read(i)
+        self.decoded += 1
+        self.decode_time += dt
+        return img, img0
+
+    def close(self):
+        # Stop the prefetch pool and video decoder, i.e. when iteration ends or is abandoned
+        if self.pool:
+            self.pool.terminate()
+            self.pool = None
+        self.window = {}
+        if self.cap:
+            self.decoder.close()
+            self.cap.release()
+
+    def __del__(self):
+        if getattr(self, 'pool', None):
+            self.pool.terminate()
+
     def new_video(self, path):
         self.frame = 0
         self.cap = cv2.VideoCapture(path)
         self.frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.decoder = VideoDecoder(self.cap, self.vid_buffer, self.vid_stride, self.vid_latest)
 
     def __len__(self):
         return self.nf  # number of files
@@ -285,8 +449,16 @@ class LoadWebcam:  # for inference
 
 class LoadStreams:
     # YOLOv5 streamloader, i.e. `python detect.py --source 'rtsp://example.com/media.mp4'  # RTSP, RTMP, HTTP streams`
-    def __init__(self, sources='streams.txt', img_size=640, stride=32, auto=True):
+    # Each stream thread pushes (sequence number, frame) into a small ring buffer. __next__ blocks until new frames
+    # arrive, returns the newest frame per stream and counts frames it skipped (dropped) or had to repeat (duplicates).
+    # If no stream delivers a frame for `stall` seconds, i.e. a hung camera, the last frames are returned again
+    # With raw=True the original BGR frames are returned in place of the letterboxed input, i.e. for a Preprocessor
+    # reuse_buffers > 0 letterboxes into that many persistent batch buffers reused round-robin
+    def __init__(self, sources='streams.txt', img_size=640, stride=32, auto=True, buffer=3, raw=False,
+                 reuse_buffers=0, stall=1.0):
         self.mode = 'stream'
+        self.raw = raw
+        self.stall = stall
         self.img_size = img_size
         self.stride = stride
 
@@ -298,6 +470,11 @@ class LoadStreams:
 
         n = len(sources)
         self.imgs, self.fps, self.frames, self.threads = [None] * n, [0] * n, [0] * n, [None] * n
+        self.buffers = [deque(maxlen=max(int(buffer), 1)) for _ in range(n)]  # ring buffers of (seq, frame)
+        self.seq, self.last = [0] * n, [0] * n  # newest sequence number pushed, returned per stream
+        self.dropped, self.duplicates = [0] * n, [0] * n  # frames never returned, frames returned again
+        self.ended = [False] * n  # stream thread finished
+        self.cond = Condition()
         self.sources = [clean_str(x) for x in sources]  # clean source names for later
         self.auto = auto
         for i, s in enumerate(sources):  # index, source
@@ -317,33 +494,49 @@ class LoadStreams:
             self.fps[i] = max((fps if math.isfinite(fps) else 0) % 100, 0) or 30  # 30 FPS fallback
 
             _, self.imgs[i] = cap.read()  # guarantee first frame
+            self.buffers[i].append((1, self.imgs[i]))
+            self.seq[i] = 1
             self.threads[i] = Thread(target=self.update, args=([i, cap, s]), daemon=True)
             LOGGER.info(f"{st} Success ({self.frames[i]} frames {w}x{h} at {self.fps[i]:.2f} FPS)")
             self.threads[i].start()
         LOGGER.info('')  # newline
+        self.check_shapes(reuse_buffers)
 
+    def check_shapes(self, reuse_buffers=0):
         # check for common shapes
         s = np.stack([letterbox(x, self.img_size, stride=self.stride, auto=self.auto)[0].shape for x in self.imgs])
         self.rect = np.unique(s, axis=0).shape[0] == 1  # rect inference if all shapes equal
         if not self.rect:
             LOGGER.warning('WARNING: Stream shapes differ. For optimal performance supply similarly-shaped streams.')
+        self.lb = Letterbox(self.img_size, self.stride, self.rect and self.auto, buffers=reuse_buffers) \
+            if reuse_buffers else None
 
     def update(self, i, cap, stream):
-        # Read stream `i` frames in daemon thread
-        n, f, read = 0, self.frames[i], 1  # frame number, frame array, inference every 'read' frame
-        while cap.isOpened() and n < f:
-            n += 1
-            # _, self.imgs[index] = cap.read()
-            cap.grab()
-            if n % read == 0:
-                success, im = cap.retrieve()
-                if success:
-                    self.imgs[i] = im
-                else:
-                    LOGGER.warning('WARNING: Video stream unresponsive, please check your IP camera connection.')
-                    self.imgs[i] = np.zeros_like(self.imgs[i])
-                    cap.open(stream)  # re-open stream if signal was lost
-            time.sleep(1 / self.fps[i])  # wait time
+        # Read stream `i` frames in daemon thread, live sources block in grab(), files are paced to their FPS
+        n, f, read, t0 = 0, self.frames[i], 1, time.time()  # frame number, frame count, every 'read' frame, start
+        try:
+            while cap.isOpened() and n < f:
+                n += 1
+                # _, self.imgs[index] = cap.read()
+                cap.grab()
+                if n % read == 0:
+                    success, im = cap.retrieve()
+                    if success:
+                        with self.cond:
+                            buf = self.buffers[i]
+                            self.dropped[i] += len(buf) == buf.maxlen  # oldest unread frame overwritten
+                            self.seq[i] += 1
+                            buf.append((self.seq[i], im))
+                            self.cond.notify_all()
+                    else:
+                        LOGGER.warning('WARNING: Video stream unresponsive, please check your IP camera connection.')
+                        cap.open(stream)  # re-open stream if signal was lost
+                if math.isfinite(f):
+                    time.sleep(max(t0 + n / self.fps[i] - time.time(), 0))  # real-time playback of finite sources
+        finally:
+            with self.cond:
+                self.ended[i] = True
+                self.cond.notify_all()  # wake __next__ to stop
 
     def __iter__(self):
         self.count = -1
@@ -355,8 +548,28 @@ class LoadStreams:
             cv2.destroyAllWindows()
             raise StopIteration
 
+        # Wait for new frames, all streams for up to 2 frame intervals, then any stream
+        with self.cond:
+            self.cond.wait_for(lambda: all(self.fresh()) or any(self.ended), timeout=2 / min(self.fps))
+            self.cond.wait_for(lambda: any(self.fresh()) or any(self.ended), timeout=self.stall)  # stalled: repeat
+            if any(self.ended):
+                raise StopIteration
+            for i, buf in enumerate(self.buffers):
+                if buf:  # newest frame, skip stale ones
+                    self.dropped[i] += len(buf) - 1
+                    self.last[i], self.imgs[i] = buf[-1]
+                    buf.clear()
+                else:  # no new frame from this stream, repeat its last one
+                    self.duplicates[i] += 1
+        return self.output()
+
+    def output(self):
         # Letterbox
         img0 = self.imgs.copy()
+        if self.raw:
+            return self.sources, img0, img0, None, ''
+        if self.lb:  # cached geometry, into a reused BCHW RGB buffer
+            return self.sources, self.lb.batch(img0), img0, None, ''
         img = [letterbox(x, self.img_size, stride=self.stride, auto=self.rect and self.auto)[0] for x in img0]
 
         # Stack
@@ -368,10 +581,121 @@ class LoadStreams:
 
         return self.sources, img, img0, None, ''
 
+    def fresh(self):
+        # Per-stream flags, True if a frame newer than the last returned one is buffered
+        return [s > x for s, x in zip(self.seq, self.last)]
+
+    def summary(self):
+        return ', '.join(f'{i}: last frame {self.last[i]}, {self.dropped[i]} dropped, {self.duplicates[i]} duplicates'
+                         for i in range(len(self.sources)))
+
     def __len__(self):
         return len(self.sources)  # 1E12 frames = 32 streams at 30 FPS for 30 years
 
 
+class LoadStreamProcesses(LoadStreams):
+    # LoadStreams with a capture process per source, i.e. `python detect.py --source 0 --stream-processes`
+    # Each process decodes into its own shared-memory FrameRing and __next__ returns zero-copy views of the newest
+    # frames, so camera I/O never competes with inference for the GIL. Returned frames stay valid while the caller takes
+    # up to `hold` more frames per stream, set hold to the number of frames that can be in flight downstream.
+    # A capture process that dies or does not open its source within `timeout` seconds raises a RuntimeError
+    def __init__(self, sources='streams.txt', img_size=640, stride=32, auto=True, raw=False, reuse_buffers=0, hold=2,
+                 stall=1.0, timeout=60):
+        self.mode = 'stream'
+        self.raw = raw
+        self.stall = stall
+        self.img_size = img_size
+        self.stride = stride
+        self.auto = auto
+
+        if os.path.isfile(sources):
+            with open(sources) as f:
+                sources = [x.strip() for x in f.read().strip().splitlines() if len(x.strip())]
+        else:
+            sources = [sources]
+
+        n = len(sources)
+        ctx = mp.get_context('spawn')
+        self.cond, self.stop, info = ctx.Condition(), ctx.Event(), ctx.Queue()  # one condition for all rings
+        self.procs, self.rings, self.fps, self.frames = [], [None] * n, [0] * n, [0] * n
+        for i, s in enumerate(sources):  # index, source
+            if 'youtube.com/' in s or 'youtu.be/' in s:  # if source is YouTube video
+                check_requirements(('pafy', 'youtube_dl==2020.12.2'))
+                import pafy
+                s = pafy.new(s).getbest(preftype="mp4").url  # YouTube URL
+            s = eval(s) if s.isnumeric() else s  # i.e. s = '0' local webcam
+            self.procs.append(ctx.Process(target=capture, args=(i, s, hold + 2, self.cond, info, self.stop),
+                                          daemon=True))
+            self.procs[-1].start()
+        t = time.time()
+        while None in self.rings:
+            try:
+                i, name, fps, frames = info.get(timeout=0.5)
+            except queue.Empty:  # check the processes still waiting to report are alive
+                waiting = [i for i, r in enumerate(self.rings) if r is None]
+                dead = [i for i in waiting if not self.procs[i].is_alive()]
+                if dead or time.time() - t > timeout:
+                    self.close()
+                    i = (dead or waiting)[0]
+                    raise RuntimeError(f'{i + 1}/{n}: {sources[i]}... capture process ' +
+                                       (f'exited with code {self.procs[i].exitcode}' if dead else
+                                        f'did not open the source within {timeout}s') + ' before reporting')
+                continue
+            st = f'{i + 1}/{n}: {sources[i]}... '
+            if not name:
+                self.close()
+                raise AssertionError(f'{st}Failed to open {sources[i]}')
+            self.rings[i] = FrameRing(name, self.cond, hold=hold)
+            self.fps[i], self.frames[i] = fps, frames
+            h, w = self.rings[i].shape[:2]
+            LOGGER.info(f"{st} Success ({frames} frames {w}x{h} at {fps:.2f} FPS, capture process)")
+        LOGGER.info('')  # newline
+
+        self.sources = [clean_str(x) for x in sources]  # clean source names for later
+        self.last, self.imgs = [0] * n, [None] * n
+        self.dropped, self.duplicates = [0] * n, [0] * n  # frames never returned, frames returned again
+        with self.cond:
+            for i, ring in enumerate(self.rings):
+                self.last[i], self.imgs[i] = ring.take()  # guarantee first frame
+        self.check_shapes(reuse_buffers)
+
+    def __next__(self):
+        self.count += 1
+        if not all(x.is_alive() for x in self.procs) or cv2.waitKey(1) == ord('q'):  # q to quit
+            cv2.destroyAllWindows()
+            raise StopIteration
+
+        # Wait for new frames, all streams for up to 2 frame intervals, then any stream
+        with self.cond:
+            ended = lambda: any(r.ended for r in self.rings)
+            self.cond.wait_for(lambda: all(self.fresh()) or ended(), timeout=2 / min(self.fps))
+            self.cond.wait_for(lambda: any(self.fresh()) or ended(), timeout=self.stall)  # stalled: repeat
+            if ended():
+                raise StopIteration
+            for i, ring in enumerate(self.rings):
+                if ring.seq > self.last[i]:  # newest frame, skip stale ones
+                    self.dropped[i] += ring.seq - self.last[i] - 1
+                    self.last[i], self.imgs[i] = ring.take()
+                else:  # no new frame from this stream, repeat its last one
+                    self.duplicates[i] += 1
+        return self.output()
+
+    def fresh(self):
+        return [r.seq > x for r, x in zip(self.rings, self.last)]
+
+    def close(self):
+        # Stop capture processes and release the rings, frames returned earlier must not be used afterwards
+        self.stop.set()
+        for p in self.procs:
+            p.join(5)
+            if p.is_alive():
+                p.terminate()
+        self.imgs = [None] * len(self.rings)
+        for ring in self.rings:
+            if ring is not None:  # opened
+                ring.close()
+
+
 def img2label_paths(img_paths):
     # Define label paths as a function of image paths
     sa, sb = os.sep + 'images' + os.sep, os.sep + 'labels' + os.sep  # /images/, /labels/ substrings
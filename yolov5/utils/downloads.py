@@ -11,7 +11,6 @@ import urllib
 from pathlib import Path
 from zipfile import ZipFile
 
-import requests
 import torch
 
 
@@ -42,6 +41,7 @@ def safe_download(file, url, url2=None, min_bytes=1E0, error_msg=''):
 
 def attempt_download(file, repo='ultralytics/yolov5'):  # from utils.downloads import *; attempt_download()
     # Attempt file download if does not exist
+    from utils.general import is_offline  # scoped to avoid circular import
     file = Path(str(file).strip().replace("'", ''))
 
     if not file.exists():
@@ -52,13 +52,19 @@ def attempt_download(file, repo='ultralytics/yolov5'):  # from utils.downloads i
             file = name.split('?')[0]  # parse authentication https://url.com/file.txt?auth...
             if Path(file).is_file():
                 print(f'Found {url} locally at {file}')  # file already exists
+            elif is_offline():
+                print(f'{file} not found, download skipped (offline)')
             else:
                 safe_download(file=file, url=url, min_bytes=1E5)
             return file
 
         # GitHub assets
+        if is_offline():
+            print(f'{file} not found, download skipped (offline)')
+            return str(file)
         file.parent.mkdir(parents=True, exist_ok=True)  # make parent dir (if required)
         try:
+            import requests  # slow import, only needed to download
             response = requests.get(f'https://api.github.com/repos/{repo}/releases/latest').json()  # github api
             assets = [x['name'] for x in response['assets']]  # release assets, i.e. ['yolov5s.pt', 'yolov5m.pt', ...]
             tag = response['tag_name']  # i.e. 'v1.0'
@@ -0,0 +1,127 @@
+"""
+Run an asyncio REST API exposing local YOLOv5 weights, concurrent requests are micro-batched into one forward pass
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+import tornado.web
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[2]  # YOLOv5 root directory
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+from utils.batching import MicroBatcher
+
+DETECTION_URL = "/v1/object-detection/yolov5s"
+STATS_URL = "/v1/stats"
+COLS = "xmin", "ymin", "xmax", "ymax", "confidence", "class"
+
+
+def decode(data):
+    # Encoded image bytes to a BGR numpy image, None if undecodable
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+class DetectHandler(tornado.web.RequestHandler):
+    def initialize(self, batcher, decoder, names):
+        self.batcher, self.decoder, self.names = batcher, decoder, names
+
+    async def post(self):
+        files = self.request.files.get("image")
+        if not files:
+            raise tornado.web.HTTPError(400, "missing 'image' file")
+        im = await asyncio.get_running_loop().run_in_executor(self.decoder, decode, files[0].body)
+        if im is None:
+            raise tornado.web.HTTPError(400, "undecodable image")
+        det = await self.batcher(im)
+        self.set_header("Content-Type", "application/json")
+        self.write(json.dumps([{**dict(zip(COLS, x[:5] + [int(x[5])])), "name": self.names[int(x[5])]}
+                               for x in det.tolist()]))
+
+
+class StatsHandler(tornado.web.RequestHandler):
+    def initialize(self, stats):
+        self.stats = stats
+
+    def get(self):
+        self.write(self.stats())
+
+
+def make_app(session, max_batch=8, max_wait=0.005, decode_workers=4, imgsz=640, pool=None, **kwargs):
+    # Tornado application serving session, kwargs are passed to session.infer() (conf_thres, iou_thres, ...).
+    # With a utils.workers.WorkerPool each request is handed to the next free worker process instead
+    if pool:
+        submitter = ThreadPoolExecutor(1)  # pool.submit() waits for a free shared memory slot, off the event loop
+
+        async def batcher(im):
+            future = await asyncio.get_running_loop().run_in_executor(submitter, pool.submit, im)
+            return await asyncio.wait_for(asyncio.wrap_future(future), pool.timeout)
+
+        names, stats = pool.names, pool.stats
+    else:
+        batcher = MicroBatcher(lambda ims: session.infer(ims, imgsz=(imgsz, imgsz), **kwargs), max_batch, max_wait,
+                               executor=ThreadPoolExecutor(1))  # one forward at a time, batches queue in between
+        names, stats = session.names, batcher.stats
+    decoder = ThreadPoolExecutor(decode_workers)
+    return tornado.web.Application([
+        (DETECTION_URL, DetectHandler, dict(batcher=batcher, decoder=decoder, names=names)),
+        (STATS_URL, StatsHandler, dict(stats=stats))]), batcher
+
+
+async def main(opt):
+    session, pool = None, None
+    if opt.workers:  # model replicas in worker processes
+        from utils.workers import WorkerPool
+        pool = WorkerPool(opt.weights, opt.workers, opt.threads, opt.affinity, device=opt.device, half=opt.half,
+                          data=opt.data, imgsz=(opt.imgsz, opt.imgsz), conf_thres=opt.conf_thres,
+                          iou_thres=opt.iou_thres)
+    else:
+        from detect import load_session
+        session = load_session(weights=opt.weights, data=opt.data, device=opt.device, half=opt.half)  # local, offline
+        session.warmup((opt.imgsz, opt.imgsz), bs=opt.max_batch)
+    app, batcher = make_app(session, opt.max_batch, opt.max_wait / 1E3, opt.decode_workers, opt.imgsz, pool=pool,
+                            conf_thres=opt.conf_thres, iou_thres=opt.iou_thres)
+    app.listen(opt.port)
+    print(f"Serving {opt.weights} on http://0.0.0.0:{opt.port}{DETECTION_URL}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        print(f"Workers: {pool}" if pool else f"Batching: {batcher}")
+        if pool:
+            pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Asyncio API exposing a local YOLOv5 model with micro-batching")
+    parser.add_argument("--port", default=5000, type=int, help="port number")
+    parser.add_argument("--weights", required=True, type=str, help="local model path")
+    parser.add_argument("--data", default=ROOT / "data/coco128.yaml", help="dataset.yaml path, for class names")
+    parser.add_argument("--device", default="", help="cuda device, i.e. 0 or cpu")
+    parser.add_argument("--half", action="store_true", help="use FP16 half-precision inference")
+    parser.add_argument("--imgsz", default=640, type=int, help="inference size (pixels)")
+    parser.add_argument("--conf-thres", default=0.25, type=float, help="confidence threshold")
+    parser.add_argument("--iou-thres", default=0.45, type=float, help="NMS IoU threshold")
+    parser.add_argument("--max-batch", default=8, type=int, help="max requests per forward pass")
+    parser.add_argument("--max-wait", default=5, type=float, help="max ms a request waits for its batch to fill")
+    parser.add_argument("--decode-workers", default=4, type=int, help="image decoding threads")
+    parser.add_argument("--workers", default=0, type=int, help="model replicas in worker processes, 0 in-process")
+    parser.add_argument("--threads", default=0, type=int, help="torch threads per worker process, 0 to split cores")
+    parser.add_argument("--affinity", action="store_true", help="pin each worker process to its own cores")
+    parser.add_argument("--offline", action="store_true", help="skip network checks and downloads, or YOLOv5_OFFLINE=true")
+    opt = parser.parse_args()
+    if opt.offline:
+        os.environ["YOLOv5_OFFLINE"] = "true"  # inherited by worker processes
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # shut worker processes down and free shared memory
+    try:
+        asyncio.run(main(opt))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,64 @@
+"""
+Load-test a YOLOv5 REST API, reports latency percentiles and requests/sec
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+from tornado.httpclient import AsyncHTTPClient
+
+DETECTION_URL = "http://localhost:5000/v1/object-detection/yolov5s"
+
+
+def multipart(data, name):
+    # multipart/form-data body with a single 'image' file field, returns body, content type
+    boundary = uuid.uuid4().hex
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="{name}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n').encode() + data + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+async def client(http, url, bodies, deadline, latency, errors):
+    # One closed-loop client, sends the next request as soon as the previous one completes
+    i = 0
+    while time.time() < deadline:
+        body, content_type = bodies[i % len(bodies)]
+        t = time.time()
+        try:
+            await http.fetch(url, method="POST", body=body, headers={"Content-Type": content_type},
+                             request_timeout=60)
+            latency.append(time.time() - t)
+        except Exception:
+            errors.append(1)
+        i += 1
+
+
+async def main(opt):
+    files = [f for f in sorted(Path(opt.images).glob("*")) if f.is_file()] if Path(opt.images).is_dir() \
+        else [Path(opt.images)]
+    bodies = [multipart(f.read_bytes(), f.name) for f in files]
+    AsyncHTTPClient.configure(None, max_clients=opt.concurrency)
+    http = AsyncHTTPClient()
+    latency, errors = [], []
+    if opt.warmup:
+        await client(http, opt.url, bodies, time.time() + opt.warmup, [], [])
+    t = time.time()
+    await asyncio.gather(*(client(http, opt.url, bodies, t + opt.duration, latency, errors)
+                           for _ in range(opt.concurrency)))
+    dt = time.time() - t
+    p = np.percentile(latency, (50, 95, 99)) * 1E3 if latency else np.zeros(3)
+    print(f"{len(latency)} requests in {dt:.1f}s with {opt.concurrency} clients, {len(errors)} errors: "
+          f"{len(latency) / dt:.1f} req/s, latency p50 {p[0]:.0f}ms p95 {p[1]:.0f}ms p99 {p[2]:.0f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load generator for the YOLOv5 REST APIs")
+    parser.add_argument("--url", default=DETECTION_URL, help="detection endpoint")
+    parser.add_argument("--images", default=Path(__file__).parents[2] / "data/images", help="image file or directory")
+    parser.add_argument("--concurrency", default=8, type=int, help="concurrent clients")
+    parser.add_argument("--duration", default=10, type=float, help="test duration (seconds)")
+    parser.add_argument("--warmup", default=1, type=float, help="single-client warmup before the test (seconds)")
+    asyncio.run(main(parser.parse_args()))
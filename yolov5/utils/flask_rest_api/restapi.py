@@ -3,11 +3,20 @@ Run a rest API exposing the yolov5s object detection model
 """
 import argparse
 import io
+import json
+import sys
+from pathlib import Path
 
+import numpy as np
 import torch
 from flask import Flask, request
 from PIL import Image
 
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[2]  # YOLOv5 root directory
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
 app = Flask(__name__)
 
 DETECTION_URL = "/v1/object-detection/yolov5s"
@@ -24,6 +33,12 @@ def predict():
 
         img = Image.open(io.BytesIO(image_bytes))
 
+        if session:  # local weights, shared DetectorSession
+            det = session.predict(np.asarray(img.convert("RGB"))[..., ::-1])[0]  # RGB to BGR
+            cols = "xmin", "ymin", "xmax", "ymax", "confidence", "class"
+            return json.dumps([{**dict(zip(cols, x[:5] + [int(x[5])])), "name": session.names[int(x[5])]}
+                               for x in det.tolist()])
+
         results = model(img, size=640)  # reduce size=320 for faster inference
         return results.pandas().xyxy[0].to_json(orient="records")
 
@@ -31,7 +46,13 @@ def predict():
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Flask API exposing YOLOv5 model")
     parser.add_argument("--port", default=5000, type=int, help="port number")
+    parser.add_argument("--weights", default="", type=str, help="local model path, serve via a warm DetectorSession")
     args = parser.parse_args()
 
-    model = torch.hub.load("ultralytics/yolov5", "yolov5s", force_reload=True)  # force_reload to recache
+    session = None
+    if args.weights:
+        from detect import load_session
+        session = load_session(weights=args.weights)
+    else:
+        model = torch.hub.load("ultralytics/yolov5", "yolov5s", force_reload=True)  # force_reload to recache
     app.run(host="0.0.0.0", port=args.port)  # debug=True causes Restarting with stat
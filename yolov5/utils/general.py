@@ -24,7 +24,6 @@ from zipfile import ZipFile
 
 import cv2
 import numpy as np
-import pandas as pd
 import pkg_resources as pkg
 import torch
 import torchvision
@@ -43,7 +42,6 @@ FONT = 'Arial.ttf'  # https://ultralytics.com/assets/Arial.ttf
 
 torch.set_printoptions(linewidth=320, precision=5, profile='long')
 np.set_printoptions(linewidth=320, formatter={'float_kind': '{:11.5g}'.format})  # format short g, %precision=5
-pd.options.display.max_columns = 10
 cv2.setNumThreads(0)  # prevent OpenCV from multithreading (incompatible with PyTorch DataLoader)
 os.environ['NUMEXPR_MAX_THREADS'] = str(NUM_THREADS)  # NumExpr max threads
 os.environ['OMP_NUM_THREADS'] = str(NUM_THREADS)  # OpenMP max threads (PyTorch and SciPy)
@@ -192,6 +190,11 @@ def is_docker():
     return Path('/workspace').exists()  # or Path('/.dockerenv').exists()
 
 
+def is_offline():
+    # Is offline mode set? YOLOv5_OFFLINE=true skips network checks, downloads and auto-installs
+    return str(os.getenv('YOLOv5_OFFLINE', False)).lower() in ('1', 'true')
+
+
 def is_colab():
     # Is environment a Google Colab instance?
     try:
@@ -249,6 +252,8 @@ def file_size(path):
 def check_online():
     # Check internet connectivity
     import socket
+    if is_offline():
+        return False
     try:
         socket.create_connection(("1.1.1.1", 443), 5)  # check host accessibility
         return True
@@ -305,6 +310,8 @@ def check_version(current='0.0.0', minimum='0.0.0', name='version ', pinned=Fals
 @try_except
 def check_requirements(requirements=ROOT / 'requirements.txt', exclude=(), install=True):
     # Check installed dependencies meet requirements (pass *.txt file or list of packages)
+    if is_offline():  # no pip, imports fail as usual if a package is missing
+        return
     prefix = colorstr('red', 'bold', 'requirements:')
     check_python()  # check python version
     if isinstance(requirements, (str, Path)):  # requirements.txt file
@@ -410,6 +417,9 @@ def check_font(font=FONT):
     # Download font to CONFIG_DIR if necessary
     font = Path(font)
     if not font.exists() and not (CONFIG_DIR / font.name).exists():
+        if is_offline():
+            LOGGER.warning(f'WARNING: {font.name} not found, download skipped (offline)')
+            return
         url = "https://ultralytics.com/assets/" + font.name
         LOGGER.info(f'Downloading {url} to {CONFIG_DIR / font.name}...')
         torch.hub.download_url_to_file(url, str(font), progress=False)
@@ -828,6 +838,7 @@ def print_mutation(results, hyp, save_dir, bucket, prefix=colorstr('evolve: ')):
 
     # Save yaml
     with open(evolve_yaml, 'w') as f:
+        import pandas as pd
         data = pd.read_csv(evolve_csv)
         data = data.rename(columns=lambda x: x.strip())  # strip keys
         i = np.argmax(fitness(data.values[:, :4]))  #
@@ -0,0 +1,217 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Staged inference pipeline utils
+"""
+
+import threading
+from collections import deque
+
+from utils.torch_utils import time_sync
+
+_END = object()  # end-of-stream marker
+
+
+class StageStats:
+    # Per-stage latency counters, times in seconds
+    def __init__(self, name):
+        self.name = name
+        self.n, self.total, self.max, self.last, self.dropped = 0, 0.0, 0.0, 0.0, 0
+        self.lock = threading.Lock()
+
+    def update(self, dt):
+        with self.lock:
+            self.n += 1
+            self.total += dt
+            self.max = max(self.max, dt)
+            self.last = dt
+
+    def drop(self):
+        with self.lock:
+            self.dropped += 1
+
+    @property
+    def mean(self):
+        return self.total / max(self.n, 1)
+
+    def __str__(self):
+        return f'{self.name} {self.mean * 1E3:.1f}ms mean, {self.max * 1E3:.1f}ms max, {self.n} done, ' \
+               f'{self.dropped} dropped'
+
+
+class StageQueue:
+    # Bounded FIFO between pipeline stages with 'block' or 'drop' (drop-oldest) backpressure policy
+    def __init__(self, maxsize=4, policy='block', on_drop=None):
+        assert policy in ('block', 'drop'), f"Invalid backpressure policy '{policy}', valid values are block, drop"
+        self.maxsize, self.policy, self.on_drop = max(maxsize, 1), policy, on_drop
+        self.items = deque()
+        self.cond = threading.Condition()
+        self.closed = False  # no more puts, get() returns _END once drained
+        self.aborted = False  # pipeline torn down, drop everything
+
+    def put(self, item):
+        with self.cond:
+            if self.policy == 'block':
+                while len(self.items) >= self.maxsize and not self.aborted:
+                    self.cond.wait()
+            elif len(self.items) >= self.maxsize and self.on_drop:
+                self.on_drop(self.items.popleft())
+            if not self.aborted:
+                self.items.append(item)
+            self.cond.notify_all()
+
+    def get(self):
+        with self.cond:
+            while not self.items and not self.closed and not self.aborted:
+                self.cond.wait()
+            if self.aborted or not self.items:
+                return _END
+            item = self.items.popleft()
+            self.cond.notify_all()
+            return item
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def abort(self):
+        with self.cond:
+            self.aborted = True
+            self.items.clear()
+            self.cond.notify_all()
+
+
+class Pipeline:
+    # YOLOv5 staged executor: capture iterator -> stage functions -> in-order results for the caller's sink
+    # Usage:
+    #   pipe = Pipeline(dataset, [('preprocess', f1, 2), ('infer', f2, 1)], maxsize=4, policy='block')
+    #   for y in pipe:  # y = f2(f1(x)) for each x in dataset, returned in capture order
+    #       sink(y)
+    # A stage function may return None to discard an item. With threaded=False stages run in-line in the caller.
+    def __init__(self, source, stages, maxsize=4, policy='block', threaded=True):
+        self.source = source
+        self.stages = [(name, fn, max(int(n), 1)) for name, fn, n in stages]
+        self.maxsize, self.policy, self.threaded = maxsize, policy, threaded
+        self.stats = {name: StageStats(name) for name in ['capture'] + [x[0] for x in self.stages]}
+        self.queues, self.threads, self.error = [], [], None
+        self.lock = threading.Lock()
+        self.dropped = set()  # sequence numbers dropped by backpressure or by a stage
+
+    def __iter__(self):
+        if not self.threaded:
+            yield from self._serial()
+            return
+
+        producers = list(self.stats)  # queue i is fed by stage producers[i]
+        self.queues = [StageQueue(self.maxsize, self.policy, on_drop=lambda x, name=name: self._drop(x[0], name))
+                       for name in producers]
+        self.threads = [threading.Thread(target=self._capture, daemon=True)]
+        for i, (name, fn, n) in enumerate(self.stages):
+            alive = [n]  # workers left on this stage, the last one closes the output queue
+            self.threads += [threading.Thread(target=self._work, args=(i, name, fn, alive), daemon=True)
+                             for _ in range(n)]
+        for t in self.threads:
+            t.start()
+
+        try:
+            pending, seq = {}, 0  # reorder buffer {seq: y}, next sequence number to return
+            while True:
+                x = self.queues[-1].get()
+                if x is _END:
+                    break
+                pending[x[0]] = x[1]
+                while True:
+                    with self.lock:
+                        while seq in self.dropped:
+                            self.dropped.discard(seq)
+                            seq += 1
+                    if seq not in pending:
+                        break
+                    yield pending.pop(seq)
+                    seq += 1
+            for k in sorted(pending):  # flush items queued behind a gap
+                yield pending[k]
+            if self.error:
+                raise self.error
+        finally:
+            self.close()
+
+    def close(self):
+        # Tear down worker threads, safe to call more than once
+        for q in self.queues:
+            q.abort()
+        for t in self.threads:
+            if t is not threading.current_thread():
+                t.join(timeout=1.0)  # a capture thread may be blocked on a camera read
+
+    def summary(self):
+        return ', '.join(str(x) for x in self.stats.values())
+
+    def _drop(self, seq, name):
+        self.stats[name].drop()
+        with self.lock:
+            self.dropped.add(seq)
+
+    def _capture(self):
+        q, stats = self.queues[0], self.stats['capture']
+        try:
+            it, seq = iter(self.source), 0
+            while not q.aborted:
+                t = time_sync()
+                try:
+                    x = next(it)
+                except StopIteration:
+                    break
+                stats.update(time_sync() - t)
+                q.put((seq, x))
+                seq += 1
+        except Exception as e:
+            self._fail(e)
+        q.close()
+
+    def _work(self, i, name, fn, alive):
+        qi, qo, stats = self.queues[i], self.queues[i + 1], self.stats[name]
+        try:
+            while True:
+                x = qi.get()
+                if x is _END:
+                    break
+                seq, x = x
+                t = time_sync()
+                y = fn(x)
+                stats.update(time_sync() - t)
+                if y is None:
+                    self._drop(seq, name)
+                else:
+                    qo.put((seq, y))
+        except Exception as e:
+            self._fail(e)
+        with self.lock:
+            alive[0] -= 1
+            last = alive[0] == 0
+        if last:
+            qo.close()
+
+    def _fail(self, e):
+        self.error = self.error or e
+        for q in self.queues:
+            q.abort()
+
+    def _serial(self):
+        it, capture = iter(self.source), self.stats['capture']
+        while True:
+            t = time_sync()
+            try:
+                x = next(it)
+            except StopIteration:
+                return
+            capture.update(time_sync() - t)
+            for name, fn, _ in self.stages:
+                t = time_sync()
+                x = fn(x)
+                self.stats[name].update(time_sync() - t)
+                if x is None:
+                    self.stats[name].drop()
+                    break
+            else:
+                yield x
@@ -4,7 +4,6 @@ Plotting utils
 """
 
 import math
-import os
 from copy import copy
 from pathlib import Path
 
@@ -12,8 +11,6 @@ import cv2
 import matplotlib
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
-import seaborn as sn
 import torch
 from PIL import Image, ImageDraw, ImageFont
 
@@ -22,7 +19,6 @@ from utils.general import (CONFIG_DIR, FONT, LOGGER, Timeout, check_font, check_
 from utils.metrics import fitness
 
 # Settings
-RANK = int(os.getenv('RANK', -1))
 matplotlib.rc('font', **{'size': 11})
 matplotlib.use('Agg')  # for writing to files only
 
@@ -62,12 +58,11 @@ def check_pil_font(font=FONT, size=10):
             return ImageFont.truetype(str(font), size)
         except TypeError:
             check_requirements('Pillow>=8.4.0')  # known issue https://github.com/ultralytics/yolov5/issues/5374
+        except OSError:  # font not available, i.e. offline
+            return ImageFont.load_default()
 
 
 class Annotator:
-    if RANK in (-1, 0):
-        check_pil_font()  # download TTF if necessary
-
     # YOLOv5 Annotator for train/val mosaics and jpgs and detect/hub inference annotations
     def __init__(self, im, line_width=None, font_size=None, font='Arial.ttf', pil=False, example='abc'):
         assert im.data.contiguous, 'Image not contiguous. Apply np.ascontiguousarray(im) to Annotator() input images.'
@@ -331,6 +326,8 @@ def plot_labels(labels, names=(), save_dir=Path('')):
     LOGGER.info(f"Plotting labels to {save_dir / 'labels.jpg'}... ")
     c, b = labels[:, 0], labels[:, 1:].transpose()  # classes, boxes
     nc = int(c.max() + 1)  # number of classes
+    import pandas as pd  # slow imports, only needed for dataset plots
+    import seaborn as sn
     x = pd.DataFrame(b.transpose(), columns=['x', 'y', 'width', 'height'])
 
     # seaborn correlogram
@@ -375,6 +372,7 @@ def plot_labels(labels, names=(), save_dir=Path('')):
 
 def plot_evolve(evolve_csv='path/to/evolve.csv'):  # from utils.plots import *; plot_evolve()
     # Plot evolve.csv hyp evolution results
+    import pandas as pd
     evolve_csv = Path(evolve_csv)
     data = pd.read_csv(evolve_csv)
     keys = [x.strip() for x in data.columns]
@@ -403,6 +401,7 @@ def plot_evolve(evolve_csv='path/to/evolve.csv'):  # from utils.plots import *;
 def plot_results(file='path/to/results.csv', dir=''):
     # Plot training results.csv. Usage: from utils.plots import *; plot_results('path/to/results.csv')
     save_dir = Path(file).parent if file else Path(dir)
+    import pandas as pd
     fig, ax = plt.subplots(2, 5, figsize=(12, 6), tight_layout=True)
     ax = ax.ravel()
     files = list(save_dir.glob('results*.csv'))
@@ -0,0 +1,139 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Inference preprocessing utils
+"""
+
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from utils.augmentations import letterbox_shape
+from utils.general import check_version
+
+
+class Letterbox:
+    # letterbox() with geometry cached per input shape, resizing straight into persistent pre-padded buffers
+    # Usage:
+    #   lb = Letterbox(640, stride=32, auto=True, buffers=2)
+    #   im = lb(im0)  # (3,h,w) RGB uint8 model input, same pixels as letterbox() + transpose + BGR to RGB
+    #   im = lb.batch([im0, im1])  # (n,3,h,w)
+    # Outputs are reused round-robin from `buffers` arrays, keep buffers > the number of outputs in flight
+    def __init__(self, new_shape=640, stride=32, auto=True, color=114, buffers=1, cache=8):
+        self.new_shape = (new_shape, new_shape) if isinstance(new_shape, int) else tuple(new_shape)
+        self.stride, self.auto, self.color = stride, auto, color
+        self.canvas = OrderedDict()  # {input shape: (geometry, padded HWC BGR canvas)}, least recently used first
+        self.cache = cache
+        self.outputs = [None] * max(int(buffers), 1)
+        self.i = 0  # next output buffer
+        self.lock = threading.Lock()
+
+    def geometry(self, shape):
+        # Output (h, w), resized (h, w) and top, left padding of letterbox() for input shape (h, w)
+        h, w = letterbox_shape(shape, self.new_shape, auto=self.auto, stride=self.stride)
+        r = min(self.new_shape[0] / shape[0], self.new_shape[1] / shape[1])
+        nh, nw = int(round(shape[0] * r)), int(round(shape[1] * r))
+        return (h, w), (nh, nw), int(round((h - nh) / 2 - 0.1)), int(round((w - nw) / 2 - 0.1))
+
+    def letterbox(self, im):
+        # Resize im into its cached canvas, return the padded HWC BGR canvas (valid until the next same-shape call)
+        shape = im.shape[:2]
+        if shape in self.canvas:
+            self.canvas.move_to_end(shape)
+        else:
+            g = self.geometry(shape)
+            self.canvas[shape] = g, np.full((*g[0], 3), self.color, dtype=np.uint8)  # borders are written once
+            if len(self.canvas) > self.cache:
+                self.canvas.popitem(last=False)
+        (_, (nh, nw), top, left), canvas = self.canvas[shape]
+        dst = canvas[top:top + nh, left:left + nw]
+        if (nh, nw) == shape:
+            np.copyto(dst, im)
+        else:
+            cv2.resize(im, (nw, nh), dst=dst, interpolation=cv2.INTER_LINEAR)
+        return canvas
+
+    def output(self, shape):
+        # Next round-robin output buffer, reallocated only when the shape changes
+        i, self.i = self.i, (self.i + 1) % len(self.outputs)
+        if self.outputs[i] is None or self.outputs[i].shape != shape:
+            self.outputs[i] = np.empty(shape, dtype=np.uint8)
+        return self.outputs[i]
+
+    def __call__(self, im):
+        with self.lock:
+            canvas = self.letterbox(im)
+            out = self.output((3, *canvas.shape[:2]))
+            np.copyto(out, canvas.transpose((2, 0, 1))[::-1])  # HWC to CHW, BGR to RGB
+        return out
+
+    def batch(self, ims):
+        with self.lock:
+            out = None
+            for i, im in enumerate(ims):
+                canvas = self.letterbox(im)
+                out = self.output((len(ims), 3, *canvas.shape[:2])) if out is None else out
+                np.copyto(out[i], canvas.transpose((2, 0, 1))[::-1])  # HWC to CHW, BGR to RGB
+        return out
+
+
+class Preprocessor:
+    # Fused letterbox + BGR to RGB + HWC to CHW + 0-255 to 0.0-1.0 of raw uint8 frames in torch, on the model device
+    # Usage:
+    #   pre = Preprocessor(640, stride=32, device=model.device, half=model.fp16)
+    #   im = pre([im0])  # (1,3,h,w) model input, same geometry as letterbox() so scale_coords() applies unchanged
+    # Equally shaped frames, i.e. a stream or video batch, are stacked and uploaded, resized, scaled and padded as one
+    # batch tensor, mixed input shapes one image at a time. On CPU the resize runs on uint8 as cv2.resize() does, so only
+    # the small resized batch is converted to float. Output is written into one of `buffers` preallocated
+    # tensors, reused round-robin. Keep buffers > the number of inputs in flight between preprocessing and the end of
+    # the forward pass, i.e. pipeline queue + workers + 1
+    def __init__(self, img_size=640, stride=32, auto=True, device='cpu', half=False, buffers=1, color=114):
+        self.img_size = (img_size, img_size) if isinstance(img_size, int) else tuple(img_size)
+        self.stride, self.auto, self.device = stride, auto, torch.device(device)
+        self.dtype = torch.float16 if half else torch.float32
+        self.pad = color / 255
+        self.u8 = self.device.type == 'cpu' and check_version(torch.__version__, '2.1.0')  # uint8 bilinear resize
+        self.buffers = [None] * max(int(buffers), 1)
+        self.i = 0  # next buffer
+        self.lock = threading.Lock()
+
+    def buffer(self, shape):
+        # Next round-robin input buffer, reallocated only when the batch shape changes
+        with self.lock:
+            i, self.i = self.i, (self.i + 1) % len(self.buffers)
+            b = self.buffers[i]
+            if b is None or b.shape != shape:
+                b = self.buffers[i] = torch.empty(shape, dtype=self.dtype, device=self.device)
+        return b
+
+    def __call__(self, ims):
+        ims = ims if isinstance(ims, (list, tuple)) else [ims]
+        shapes = {letterbox_shape(x.shape[:2], self.img_size, auto=self.auto, stride=self.stride) for x in ims}
+        h, w = shapes.pop() if len(shapes) == 1 else self.img_size  # minimum rectangle only if all shapes agree
+        im = self.buffer((len(ims), 3, h, w))
+        if len({x.shape for x in ims}) == 1:
+            self.fill(im, ims[0][None] if len(ims) == 1 else np.stack(ims))
+        else:
+            for i, x in enumerate(ims):
+                self.fill(im[i:i + 1], x[None])
+        return im
+
+    def fill(self, out, x):
+        # Letterbox a uint8 (n,h0,w0,3) BGR batch x into the (n,3,h,w) output tensor out in one pass
+        (h0, w0), (h, w) = x.shape[1:3], out.shape[2:]
+        r = min(self.img_size[0] / h0, self.img_size[1] / w0)
+        nh, nw = int(round(h0 * r)), int(round(w0 * r))
+        top, left = int(round((h - nh) / 2 - 0.1)), int(round((w - nw) / 2 - 0.1))  # as letterbox()
+        x = torch.from_numpy(np.ascontiguousarray(x)).to(self.device, non_blocking=True)  # uint8 upload
+        x = x.permute(0, 3, 1, 2)  # BHWC to BCHW, channels-last view
+        if (nh, nw) != (h0, w0):
+            x = F.interpolate(x if self.u8 else x.to(self.dtype), size=(nh, nw), mode='bilinear', align_corners=False)
+        x = x.flip(1).to(self.dtype)  # BGR to RGB
+        torch.mul(x, 1 / 255, out=out[..., top:top + nh, left:left + nw])  # scale into the buffer
+        out[..., :top, :].fill_(self.pad)  # pad borders only
+        out[..., top + nh:, :].fill_(self.pad)
+        out[..., top:top + nh, :left].fill_(self.pad)
+        out[..., top:top + nh, left + nw:].fill_(self.pad)
@@ -0,0 +1,34 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Qt presentation utils
+"""
+
+import numpy as np
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QPixmap
+
+BGR888 = getattr(QImage, 'Format_BGR888', None)  # Qt >= 5.14
+
+
+def to_qimage(im):
+    # Wrap a BGR (or grayscale) uint8 numpy image as a QImage without copying, any width and row stride
+    # The QImage only borrows the numpy memory, so a reference is kept on it for the QImage's lifetime
+    im = np.ascontiguousarray(im)  # no-op for annotated frames, copies sliced views only
+    h, w = im.shape[:2]
+    if im.ndim == 2:
+        q = QImage(im.data, w, h, im.strides[0], QImage.Format_Grayscale8)
+    elif BGR888 is not None:
+        q = QImage(im.data, w, h, im.strides[0], BGR888)
+    else:  # Qt < 5.14, one swap copy made by Qt
+        return QImage(im.data, w, h, im.strides[0], QImage.Format_RGB888).rgbSwapped()
+    q.buffer = im
+    return q
+
+
+def show_frame(label, im, mode=Qt.SmoothTransformation):
+    # Paint BGR numpy image im on a QLabel, scaled on the GUI side to the label size keeping the aspect ratio
+    pixmap = QPixmap.fromImage(to_qimage(im))
+    size = label.size()
+    if pixmap.size() != size:
+        pixmap = pixmap.scaled(size, Qt.KeepAspectRatio, mode)
+    label.setPixmap(pixmap)
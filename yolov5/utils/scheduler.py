@@ -0,0 +1,130 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Real-time scheduling utils
+"""
+
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+INFER, REUSE, DROP, TRACK = 'infer', 'reuse', 'drop', 'track'  # per-frame actions
+
+
+class FrameScheduler:
+    # Per-frame infer / reuse-last-detections / drop decisions for live sources under a frame rate or latency budget
+    # Usage:
+    #   sched = FrameScheduler(target_fps=15, max_latency=0.2)
+    #   action = sched.decide(t_capture, can_reuse=last_det is not None)  # before inference
+    #   sched.done(action, t_capture, t_decide)  # once the frame is shown
+    # target_fps caps the inference rate, other frames are shown with the last detections. max_latency drops frames
+    # that are already older than the budget and reuses detections for frames an inference would make late, but still
+    # infers once the last detections are older than the budget
+    def __init__(self, target_fps=0, max_latency=0, history=1000):
+        self.period = 1 / target_fps if target_fps else 0  # min seconds between inferences
+        self.max_latency = max_latency  # seconds
+        self.cost = 0.0  # inference decide-to-shown time, exponential moving average
+        self.last_infer = 0.0  # time of the last inference decision
+        self.counts = {INFER: 0, REUSE: 0, DROP: 0, TRACK: 0}
+        self.latency = deque(maxlen=history)  # capture-to-shown seconds of recent frames
+        self.t_start, self.t_last = None, None  # first and last shown frame
+        self.lock = threading.Lock()
+
+    def decide(self, t0, can_reuse=True, now=None):
+        # Action for a frame captured at time t0
+        now = now or time.time()
+        age, stale = now - t0, now - self.last_infer  # frame age, detections age
+        with self.lock:
+            if self.max_latency and age > self.max_latency:
+                action = DROP
+            elif not can_reuse:
+                action = INFER
+            elif self.period and stale < self.period:
+                action = REUSE
+            elif self.max_latency and age + self.cost > self.max_latency and stale < self.max_latency:
+                action = REUSE
+            else:
+                action = INFER
+            if action == INFER:
+                self.last_infer = now
+            if action == DROP:
+                self.counts[DROP] += 1
+        return action
+
+    def done(self, action, t0, t_decide, now=None):
+        # Record a shown frame, its capture time and its decide() time. The action is the one finally taken, i.e. an
+        # INFER decision a tracker or motion gate turned into TRACK or REUSE
+        now = now or time.time()
+        with self.lock:
+            self.counts[action] += 1
+            self.latency.append(now - t0)
+            if action == INFER:
+                dt = now - t_decide
+                self.cost = dt if self.counts[INFER] == 1 else 0.8 * self.cost + 0.2 * dt
+            self.t_start = self.t_start or now
+            self.t_last = now
+
+    @property
+    def fps(self):
+        # Achieved shown-frame rate
+        n = self.counts[INFER] + self.counts[REUSE] + self.counts[TRACK]
+        return (n - 1) / (self.t_last - self.t_start) if n > 1 and self.t_last > self.t_start else 0.0
+
+    @property
+    def skip_ratio(self):
+        n = sum(self.counts.values())
+        return (n - self.counts[INFER]) / n if n else 0.0
+
+    def percentiles(self, q=(50, 90, 99)):
+        # Latency percentiles in seconds over recent shown frames
+        return np.percentile(self.latency, q) if self.latency else np.zeros(len(q))
+
+    def __str__(self):
+        p = self.percentiles() * 1E3
+        return f'{self.fps:.1f} FPS, latency p50 {p[0]:.0f}ms p90 {p[1]:.0f}ms p99 {p[2]:.0f}ms, ' \
+               f'{self.counts[INFER]} inferred, {self.counts[TRACK]} tracked, {self.counts[REUSE]} reused, ' \
+               f'{self.counts[DROP]} dropped, skip ratio {self.skip_ratio:.2f}'
+
+
+class MotionGate:
+    # Cheap scene-change detector ahead of the model for mostly static cameras
+    # Usage:
+    #   gate = MotionGate(threshold=0.01, refresh=30)
+    #   action = gate(im0s, can_reuse=last_det is not None)  # INFER if any stream changed since its last inference
+    # Frames are compared downsampled to `size` px wide, grayscale and blurred. A stream has changed when more than
+    # `threshold` of its pixels differ by over `diff` grey levels from the last inferred frame. Inference is forced at
+    # least every `refresh` frames
+    def __init__(self, threshold=0.01, refresh=30, size=64, diff=25):
+        self.threshold, self.refresh, self.size, self.diff = threshold, refresh, size, diff
+        self.ref = {}  # {stream index: small grayscale image of the last inferred frame}
+        self.since = 0  # frames since the last inference
+        self.gated, self.inferred = 0, 0
+
+    def small(self, im):
+        h, w = im.shape[:2]
+        im = cv2.resize(im, (self.size, max(round(self.size * h / w), 1)), interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(cv2.cvtColor(im, cv2.COLOR_BGR2GRAY), (3, 3), 0)
+
+    def changed(self, i, small):
+        ref = self.ref.get(i)
+        if ref is None or ref.shape != small.shape:
+            return True
+        return np.count_nonzero(cv2.absdiff(small, ref) > self.diff) > self.threshold * small.size
+
+    def __call__(self, ims, can_reuse=True):
+        ims = ims if isinstance(ims, list) else [ims]
+        smalls = [self.small(x) for x in ims]
+        if not can_reuse or self.since + 1 >= self.refresh or any(self.changed(i, x) for i, x in enumerate(smalls)):
+            self.ref = dict(enumerate(smalls))
+            self.since = 0
+            self.inferred += 1
+            return INFER
+        self.since += 1
+        self.gated += 1
+        return REUSE
+
+    def __str__(self):
+        n = self.gated + self.inferred
+        return f'{self.inferred} inferred, {self.gated} gated ({self.gated / max(n, 1):.0%}), refresh {self.refresh}'
@@ -0,0 +1,138 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Shared-memory frame transport utils
+"""
+
+import math
+import time
+from collections import deque
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+HEADER = 8  # int64 header fields: newest slot, newest sequence number, ended, h, w, c, slots, spare
+
+
+class FrameRing:
+    # Single-producer ring of equally shaped uint8 frames in one shared memory block, for capture in another process
+    # Usage:
+    #   ring = FrameRing.create((480, 640, 3), slots=8, cond=ctx.Condition())  # capture process
+    #   ring.write(im)  # copy a frame in and publish it with the next sequence number
+    #   ring = FrameRing(name, cond, hold=4)  # inference process
+    #   with cond: seq, im = ring.take()  # newest frame as a zero-copy numpy view
+    # The reader pins the last `hold` frames it took and the writer never overwrites a pinned or the newest slot, so
+    # views stay valid until `hold` more frames were taken. Header fields are only touched with cond held, one cond
+    # may be shared by several rings so a reader can wait on all of them at once
+    def __init__(self, name, cond, hold=2, create=False, shape=None, slots=0):
+        if create:
+            size = HEADER * 8 + slots * 16 + slots * int(np.prod(shape))
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            np.ndarray((HEADER,), np.int64, self.shm.buf)[:] = (-1, 0, 0, *shape, slots, 0)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.cond, self.hold, self.owner = cond, hold, create
+        self.header = np.ndarray((HEADER,), np.int64, self.shm.buf)
+        shape, slots = tuple(int(x) for x in self.header[3:6]), int(self.header[6])
+        self.seqs = np.ndarray((slots,), np.int64, self.shm.buf, HEADER * 8)  # sequence number per slot
+        self.pins = np.ndarray((slots,), np.int64, self.shm.buf, HEADER * 8 + slots * 8)  # reader pins per slot
+        self.frames = np.ndarray((slots, *shape), np.uint8, self.shm.buf, HEADER * 8 + slots * 16)
+        self.held = deque()  # reader side, slots pinned oldest first
+        self.skipped = 0  # writer side, frames not written because every free slot was pinned
+
+    @classmethod
+    def create(cls, shape, slots, cond):
+        return cls(None, cond, create=True, shape=shape, slots=slots)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def shape(self):
+        return self.frames.shape[1:]
+
+    @property
+    def seq(self):
+        return int(self.header[1])
+
+    @property
+    def ended(self):
+        return bool(self.header[2])
+
+    def write(self, im):
+        # Copy im into the oldest unpinned slot outside the lock, then publish it
+        with self.cond:
+            free = [k for k in range(len(self.seqs)) if not self.pins[k] and k != self.header[0]]
+            k = min(free, key=lambda k: self.seqs[k]) if free else None
+        if k is None:
+            self.skipped += 1
+            return False
+        if im.shape != self.shape:  # camera changed resolution, keep the ring geometry
+            im = cv2.resize(im, self.shape[1::-1], interpolation=cv2.INTER_LINEAR)
+        np.copyto(self.frames[k], im)
+        with self.cond:
+            self.seqs[k] = self.header[1] + 1
+            self.header[0], self.header[1] = k, self.seqs[k]
+            self.cond.notify_all()
+        return True
+
+    def take(self):
+        # Pin and return (sequence number, view) of the newest frame, call with cond held
+        k = int(self.header[0])
+        if k < 0:
+            return 0, None
+        self.pins[k] += 1
+        self.held.append(k)
+        while len(self.held) > self.hold:
+            self.pins[self.held.popleft()] -= 1
+        return int(self.seqs[k]), self.frames[k]
+
+    def end(self):
+        with self.cond:
+            self.header[2] = 1
+            self.cond.notify_all()
+
+    def close(self):
+        # Views into the frames must not be used after close()
+        self.header = self.seqs = self.pins = self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:  # frame views still referenced, unmapped at exit instead
+            pass
+        if self.owner:
+            self.shm.unlink()
+
+
+def capture(i, source, slots, cond, info, stop):
+    # Capture process for stream i: decode source into a new FrameRing, report its name and stream info on `info`.
+    # Live sources block in grab(), files are paced to their FPS. The ring is kept until `stop` is set
+    cap = cv2.VideoCapture(source)
+    ok, im = cap.read() if cap.isOpened() else (False, None)
+    if not ok:
+        info.put((i, None, 0, 0))
+        return
+    fps = cap.get(cv2.CAP_PROP_FPS)  # warning: may return 0 or nan
+    fps = max((fps if math.isfinite(fps) else 0) % 100, 0) or 30  # 30 FPS fallback
+    frames = max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0) or float('inf')  # infinite stream fallback
+    ring = FrameRing.create(im.shape, slots, cond)
+    ring.write(im)
+    info.put((i, ring.name, fps, frames))
+    n, t0 = 1, time.time()
+    try:
+        while cap.isOpened() and n < frames and not stop.is_set():
+            n += 1
+            ok, im = cap.read()
+            if ok:
+                ring.write(im)
+            elif math.isfinite(frames):
+                break
+            else:
+                cap.open(source)  # re-open stream if signal was lost
+            if math.isfinite(frames):
+                time.sleep(max(t0 + n / fps - time.time(), 0))  # real-time playback of finite sources
+    finally:
+        cap.release()
+        ring.end()
+        stop.wait()  # the reader may still hold views into the ring
+        ring.close()
@@ -0,0 +1,168 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Output sink utils
+"""
+
+import threading
+from pathlib import Path
+
+import cv2
+import torch
+
+from utils.general import xyxy2xywh
+from utils.pipeline import _END, StageQueue
+
+
+def label_rows(det, gn, conf=False):
+    # Detections (n,6) xyxy, conf, cls to normalized 'cls x y w h [conf]' --save-txt rows in one vectorised step
+    x = torch.cat((det[:, 5:6], xyxy2xywh(det[:, :4]) / gn.to(det.device), det[:, 4:5]), 1)[:, :6 if conf else 5]
+    fmt = ('%g ' * x.shape[1]).rstrip()
+    return [fmt % tuple(r) for r in x.tolist()]
+
+
+class ImageWriter:
+    # Bounded thread pool that encodes and writes images off the inference thread
+    # Usage:
+    #   writer = ImageWriter(workers=2, maxsize=16, policy='drop')
+    #   writer.write('runs/detect/exp/im.jpg', im0)  # returns immediately, im0 must not be modified afterwards
+    #   writer.close()  # flush queued images and join workers
+    # With policy='block' write() waits for a free queue slot, with 'drop' the oldest queued image is discarded.
+    def __init__(self, workers=2, maxsize=16, policy='block'):
+        self.queue = StageQueue(maxsize, policy, on_drop=self._drop)
+        self.queued, self.written, self.dropped, self.failed = 0, 0, 0, 0
+        self.pending = 0  # queued or being written
+        self.reserved = set()  # unique file names handed out but not yet on disk
+        self.cond = threading.Condition()
+        self.threads = [threading.Thread(target=self._work, daemon=True) for _ in range(max(int(workers), 1))]
+        for t in self.threads:
+            t.start()
+
+    def write(self, file, im, unique=False):
+        # Queue im for cv2.imwrite(file), unique=True increments the file name like increment_path(). Return file
+        file = Path(file)
+        with self.cond:
+            if unique:
+                file = self._reserve(file)
+            self.queued += 1
+            self.pending += 1
+        self.queue.put((file, im))
+        return file
+
+    def flush(self, timeout=None):
+        # Wait until all queued images are written, return False on timeout
+        with self.cond:
+            return self.cond.wait_for(lambda: self.pending == 0, timeout)
+
+    def close(self):
+        self.flush()
+        self.queue.close()
+        for t in self.threads:
+            t.join()
+
+    def __str__(self):
+        return f'{self.written} written, {self.dropped} dropped, {self.failed} failed, {self.pending} pending'
+
+    def _reserve(self, file):
+        # increment_path() over files on disk and files still in the queue
+        f, n = file, 2
+        while f in self.reserved or f.exists():
+            f, n = file.with_name(f'{file.stem}{n}{file.suffix}'), n + 1
+        self.reserved.add(f)
+        return f
+
+    def _done(self, file, **k):
+        with self.cond:
+            for x in k:
+                setattr(self, x, getattr(self, x) + k[x])
+            self.pending -= 1
+            self.reserved.discard(file)
+            self.cond.notify_all()
+
+    def _drop(self, item):
+        self._done(item[0], dropped=1)
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is _END:
+                break
+            file, im = item
+            try:
+                file.parent.mkdir(parents=True, exist_ok=True)
+                ok = cv2.imwrite(str(file), im)
+            except Exception:
+                ok = False
+            self._done(file, written=int(ok), failed=int(not ok))
+
+
+class VideoSink:
+    # cv2.VideoWriter owned by its own thread, frames fed through a bounded queue so encoding never blocks inference
+    # Usage:
+    #   sink = VideoSink('runs/detect/exp/vid.mp4', fps=30, size=(640, 480), maxsize=32, policy='drop', scale=0.5)
+    #   sink.write(im0)  # returns immediately, im0 must not be modified afterwards
+    #   sink.close()  # encode queued frames and release the writer
+    # scale < 1 writes a downscaled copy, resized on the sink thread. lag is the number of frames waiting to be encoded.
+    # derive=True is for frames that arrive at an irregular rate, i.e. streams or vid_latest playback: the output fps is
+    # measured from the write(im, t) timestamps over the first `probe` seconds or `maxsize` frames, whichever comes
+    # first, which are buffered until then. fps is an upper bound and the fallback without timestamps
+    def __init__(self, file, fps, size, maxsize=32, policy='block', scale=1.0, derive=False, probe=2.0):
+        self.file, self.scale, self.fps, self.derive, self.probe = Path(file), scale, fps, derive, probe
+        self.size = tuple(size) if scale == 1 else tuple(max(round(x * scale) // 2 * 2, 2) for x in size)  # (w, h)
+        self.queue = StageQueue(maxsize, policy, on_drop=self._drop)
+        self.written, self.dropped, self.lag, self.max_lag = 0, 0, 0, 0
+        self.lock = threading.Lock()
+        self.writer = None if derive else self._open(fps)
+        self.thread = threading.Thread(target=self._work, daemon=True)
+        self.thread.start()
+
+    def write(self, im, t=None):
+        # Queue frame im, t is its timestamp in seconds (source or capture time), used with derive=True
+        with self.lock:
+            self.lag += 1
+            self.max_lag = max(self.max_lag, self.lag)
+        self.queue.put((t, im))
+
+    def close(self):
+        self.queue.close()
+        self.thread.join()
+        self.writer.release()
+
+    def __str__(self):
+        return f'{self.file.name} {self.written} frames at {self.fps:.1f} FPS, {self.dropped} dropped, ' \
+               f'{self.max_lag} max lag'
+
+    def _open(self, fps):
+        self.fps = fps
+        return cv2.VideoWriter(str(self.file), cv2.VideoWriter_fourcc(*'mp4v'), fps, self.size)
+
+    def _drop(self, x):
+        with self.lock:
+            self.lag -= 1
+            self.dropped += 1
+
+    def _work(self):
+        pending = []  # (t, frame) buffered until the output fps is known, derive=True only, at most maxsize frames
+        while True:
+            x = self.queue.get()
+            if x is not _END and x[1].shape[1::-1] != self.size:
+                x = x[0], cv2.resize(x[1], self.size, interpolation=cv2.INTER_AREA)
+            if self.writer is None:  # measure the frame rate actually written
+                if x is not _END:
+                    pending.append(x)
+                    if x[0] is not None and x[0] - pending[0][0] < self.probe and len(pending) < self.queue.maxsize:
+                        continue
+                span = pending[-1][0] - pending[0][0] if len(pending) > 1 and pending[0][0] is not None else 0
+                self.writer = self._open(min((len(pending) - 1) / span, self.fps) if span > 0 else self.fps)
+                for _, im in pending:
+                    self._encode(im)
+                pending = []
+            elif x is not _END:
+                self._encode(x[1])
+            if x is _END:
+                break
+
+    def _encode(self, im):
+        self.writer.write(im)
+        with self.lock:
+            self.lag -= 1
+            self.written += 1
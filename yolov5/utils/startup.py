@@ -0,0 +1,67 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Startup profiling utils
+"""
+
+import builtins
+import sys
+import threading
+import time
+
+
+class StartupProfiler:
+    # Import and initialisation time report for application cold starts
+    # Usage:
+    #   startup = StartupProfiler(enabled='--profile-startup' in sys.argv)  # before the imports to measure
+    #   startup.mark('window shown')  # phase boundaries, from any thread
+    #   startup.report()  # top modules by import time and the phase timeline
+    # Each module is timed once when it is first imported, on whichever thread imports it. Cumulative time includes the
+    # module's own imports, self time does not
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.t0 = time.perf_counter()
+        self.imports = {}  # {module: [cumulative, self] seconds}
+        self.marks = []  # [(phase, seconds since start, thread name)]
+        self.local = threading.local()  # per-thread stack of child import time per import in progress
+        self.lock = threading.Lock()
+        self._import = builtins.__import__
+        if enabled:
+            builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._import(name, globals, locals, fromlist, level)
+        stack = self.local.__dict__.setdefault('stack', [])
+        stack.append(0.0)
+        t = time.perf_counter()
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            dt = time.perf_counter() - t
+            children = stack.pop()
+            if stack:
+                stack[-1] += dt
+            self.imports.setdefault(name, [dt, dt - children])
+
+    def mark(self, phase):
+        if self.enabled:
+            with self.lock:
+                self.marks.append((phase, time.perf_counter() - self.t0, threading.current_thread().name))
+
+    def stop(self):
+        # Stop timing imports
+        if builtins.__import__ == self._timed_import:
+            builtins.__import__ = self._import
+
+    def report(self, n=15):
+        if not self.enabled:
+            return ''
+        self.stop()
+        top = sorted(self.imports.items(), key=lambda x: -x[1][0])[:n]
+        s = [f"{'module':>40}{'cumulative':>12}{'self':>10}"]
+        s += [f'{k:>40}{c * 1E3:>10.0f}ms{t * 1E3:>8.0f}ms' for k, (c, t) in top]
+        s += [f"{'phase':>40}{'at':>12}  thread"]
+        s += [f'{k:>40}{t * 1E3:>10.0f}ms  {name}' for k, t, name in self.marks]
+        s = '\n'.join(s)
+        print(s)
+        return s
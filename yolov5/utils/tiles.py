@@ -0,0 +1,68 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Sliced (tiled) and region-of-interest inference utils
+"""
+
+import numpy as np
+import torch
+import torchvision
+
+from utils.general import clip_coords
+
+
+def tile_starts(n, size, step):
+    # Start offsets of tiles of `size` with stride `step` covering length n, the last tile flush with the end
+    if n <= size:
+        return [0]
+    starts = list(range(0, n - size, step))
+    return starts + [n - size]
+
+
+def clip_rois(rois, shape, min_size=8):
+    # ROIs [x1, y1, x2, y2] in image pixels clipped to an image of shape (h, w), smaller than min_size removed
+    h, w = shape[:2]
+    rois = [(min(max(int(x1), 0), w), min(max(int(y1), 0), h), min(max(int(x2), 0), w), min(max(int(y2), 0), h))
+            for x1, y1, x2, y2 in rois]
+    return [r for r in rois if r[2] - r[0] >= min_size and r[3] - r[1] >= min_size]
+
+
+def merge(dets, offsets, shape, full=None, iou_thres=0.45, agnostic=False, max_det=1000):
+    # Per-crop detections (n,6) in crop pixels to one (m,6) set in image pixels, class-aware NMS over the union.
+    # offsets are crop (x, y) origins in the image, full is an optional (k,6) set already in image pixels
+    dets = [d.clone() for d in dets]
+    for d, (x, y) in zip(dets, offsets):
+        d[:, [0, 2]] += float(x)
+        d[:, [1, 3]] += float(y)
+    if full is not None:
+        dets.append(full)
+    det = torch.cat(dets) if dets else torch.zeros((0, 6))
+    clip_coords(det[:, :4], shape)
+    c = det[:, 5:6] * (0 if agnostic else 7680)  # classes, as non_max_suppression()
+    i = torchvision.ops.nms(det[:, :4] + c, det[:, 4], iou_thres)[:max_det]
+    return det[i]
+
+
+class Tiler:
+    # Split high-resolution images into overlapping native-resolution tiles and merge the tile detections back
+    # Usage:
+    #   tiler = Tiler(640, overlap=0.2)
+    #   tiles, offsets = tiler(im0)  # (n,3,640,640) RGB uint8 numpy tiles, (n,2) x, y tile offsets in im0 pixels
+    #   det = merge(dets, offsets, im0.shape, full=None, iou_thres=0.45)  # (m,6) detections in im0 pixels
+    # Tiles are not resized, images smaller than a tile along a side are padded on the right and bottom instead
+    def __init__(self, size=640, overlap=0.2, color=114):
+        self.size, self.color = size, color
+        self.step = max(int(size * (1 - overlap)), 1)
+
+    def grid(self, shape):
+        # Tile (x, y) offsets for an image of shape (h, w)
+        ys, xs = tile_starts(shape[0], self.size, self.step), tile_starts(shape[1], self.size, self.step)
+        return np.array([(x, y) for y in ys for x in xs])
+
+    def __call__(self, im):
+        # Tiles of BGR HWC image im as an RGB CHW batch
+        offsets = self.grid(im.shape[:2])
+        tiles = np.full((len(offsets), 3, self.size, self.size), self.color, dtype=np.uint8)
+        for t, (x, y) in zip(tiles, offsets):
+            crop = im[y:y + self.size, x:x + self.size]
+            t[:, :crop.shape[0], :crop.shape[1]] = crop.transpose((2, 0, 1))[::-1]  # HWC to CHW, BGR to RGB
+        return tiles, offsets
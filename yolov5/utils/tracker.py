@@ -0,0 +1,131 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Multi-object tracking utils
+"""
+
+import numpy as np
+
+# Constant-velocity Kalman filter on [cx, cy, area, aspect, vcx, vcy, varea], measurements [cx, cy, area, aspect]
+F = np.eye(7)
+F[[0, 1, 2], [4, 5, 6]] = 1  # state transition
+Q = np.diag([1, 1, 1, 1, 0.01, 0.01, 1E-4])  # process noise
+R = np.diag([1, 1, 10, 10])  # measurement noise
+P0 = np.diag([10, 10, 10, 10, 1E4, 1E4, 1E4])  # initial covariance, unobserved velocities very uncertain
+
+
+def xyxy2z(x):
+    # Boxes [x1, y1, x2, y2] to Kalman measurements [cx, cy, area, aspect]
+    w, h = x[:, 2] - x[:, 0], x[:, 3] - x[:, 1]
+    return np.stack((x[:, 0] + w / 2, x[:, 1] + h / 2, w * h, w / np.maximum(h, 1E-6)), 1)
+
+
+def z2xyxy(z):
+    # Kalman states [cx, cy, area, aspect, ...] to boxes [x1, y1, x2, y2]
+    w = np.sqrt(np.maximum(z[:, 2] * z[:, 3], 0))
+    h = z[:, 2] / np.maximum(w, 1E-6)
+    return np.stack((z[:, 0] - w / 2, z[:, 1] - h / 2, z[:, 0] + w / 2, z[:, 1] + h / 2), 1)
+
+
+def iou_matrix(a, b):
+    # IoU of boxes a (n,4) and b (m,4) [x1, y1, x2, y2], shape(n,m)
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(rb - lt, 0, None), 2)
+    area_a, area_b = np.prod(a[:, 2:] - a[:, :2], 1), np.prod(b[:, 2:] - b[:, :2], 1)
+    return inter / (area_a[:, None] + area_b[None] - inter + 1E-9)
+
+
+class Sort:
+    # SORT-style tracker, all tracks filtered together with vectorised numpy
+    # Usage:
+    #   tracker = Sort(max_age=3, min_hits=2, iou_thres=0.3)
+    #   tracks = tracker.update(det)  # keyframe, det (n,6) [xyxy, conf, cls] numpy in image pixels
+    #   tracks = tracker.step()  # in-between frame, constant-velocity prediction only
+    # Both return (m,7) [xyxy, conf, cls, track id] for confirmed tracks. Detections only match tracks of their class.
+    # max_age counts keyframes a track may go unmatched, uncertain() is True once a predicted box has drifted by more
+    # than max_std of its size, i.e. the detector should run now
+    def __init__(self, max_age=3, min_hits=2, iou_thres=0.3, max_std=0.2):
+        self.max_age, self.min_hits, self.iou_thres, self.max_std = max_age, min_hits, iou_thres, max_std
+        self.x = np.zeros((0, 7))  # Kalman states
+        self.p = np.zeros((0, 7, 7))  # Kalman covariances
+        self.info = np.zeros((0, 5))  # conf, cls, id, hits, misses
+        self.next_id = 1
+        self.updates = 0  # keyframes seen
+        self.drifted = False  # uncertain() after the last update() or step(), safe to read from other threads
+
+    def __len__(self):
+        return len(self.x)
+
+    def predict(self):
+        self.x[self.x[:, 2] + self.x[:, 6] <= 0, 6] = 0  # keep area positive
+        self.x = self.x @ F.T
+        self.p = F @ self.p @ F.T + Q
+
+    def step(self):
+        # Propagate all tracks one frame without a detection
+        self.predict()
+        return self.tracks()
+
+    def update(self, det):
+        # Propagate all tracks one frame, then correct them with detections det (n,6) [xyxy, conf, cls]
+        self.predict()
+        self.updates += 1
+        det = np.asarray(det, dtype=float).reshape(-1, 6)
+        i, j = self.match(det)
+
+        # Correct matched tracks
+        if len(i):
+            p = self.p[i]
+            k = p[:, :, :4] @ np.linalg.inv(p[:, :4, :4] + R)  # Kalman gain
+            y = xyxy2z(det[j, :4]) - self.x[i, :4]  # innovation
+            self.x[i] += (k @ y[..., None])[..., 0]
+            self.p[i] = p - k @ p[:, :4]
+            self.info[i, :2] = det[j, 4:6]
+            self.info[i, 3] += 1  # hits
+            self.info[i, 4] = 0  # misses
+        unmatched = np.ones(len(self.x), dtype=bool)
+        unmatched[i] = False
+        self.info[unmatched, 4] += 1
+
+        # New tracks for unmatched detections, drop lost tracks
+        new = np.setdiff1d(np.arange(len(det)), j)
+        if len(new):
+            x = np.zeros((len(new), 7))
+            x[:, :4] = xyxy2z(det[new, :4])
+            ids = np.arange(self.next_id, self.next_id + len(new))
+            self.next_id += len(new)
+            self.x = np.concatenate((self.x, x))
+            self.p = np.concatenate((self.p, np.repeat(P0[None], len(new), 0)))
+            self.info = np.concatenate((self.info, np.stack((det[new, 4], det[new, 5], ids, np.ones(len(new)),
+                                                             np.zeros(len(new))), 1)))
+        keep = self.info[:, 4] <= self.max_age
+        self.x, self.p, self.info = self.x[keep], self.p[keep], self.info[keep]
+        return self.tracks()
+
+    def match(self, det):
+        # Optimal IoU assignment of detections to predicted tracks of the same class, returns track, det indices
+        if not len(self.x) or not len(det):
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        from scipy.optimize import linear_sum_assignment  # slow import, only needed once tracking
+        iou = iou_matrix(z2xyxy(self.x), det[:, :4])
+        iou[self.info[:, 1:2] != det[None, :, 5]] = 0  # class-aware
+        i, j = linear_sum_assignment(-iou)
+        m = iou[i, j] >= self.iou_thres
+        return i[m], j[m]
+
+    def confirmed(self):
+        # Tracks matched on the last keyframe with enough hits (all matched tracks during the first keyframes)
+        return (self.info[:, 4] == 0) & ((self.info[:, 3] >= self.min_hits) | (self.updates <= self.min_hits))
+
+    def tracks(self):
+        c = self.confirmed()
+        std = np.sqrt(self.p[c, 0, 0] + self.p[c, 1, 1])  # position standard deviation
+        self.drifted = bool((std > self.max_std * np.sqrt(np.maximum(self.x[c, 2], 1))).any())
+        return np.concatenate((z2xyxy(self.x[c]), self.info[c, :3]), 1)
+
+    def uncertain(self):
+        # True if any confirmed track's position standard deviation exceeds max_std of its box size
+        return self.drifted
+
+    def __str__(self):
+        return f'{self.confirmed().sum()} tracks, {self.next_id - 1} ids, {self.updates} keyframes'
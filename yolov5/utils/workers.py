@@ -0,0 +1,209 @@
+# YOLOv5 🚀 by Ultralytics, GPL-3.0 license
+"""
+Multi-process inference utils
+"""
+
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from utils.general import LOGGER
+
+
+def _attach(shms, slot, name):
+    # Worker-side shared memory for slot, re-attached when the pool replaced it with a larger block
+    shm = shms.get(slot)
+    if shm is None or shm.name != name:
+        if shm is not None:
+            shm.close()
+        shm = shms[slot] = shared_memory.SharedMemory(name=name)
+    return shm
+
+
+def _work(i, weights, session_kwargs, infer_kwargs, threads, cores, tasks, results):
+    # Worker process: one model replica on its own torch intra-op pool and cores
+    import torch
+
+    torch.set_num_threads(threads)
+    if cores:
+        os.sched_setaffinity(0, cores)
+    from detect import load_session
+
+    session = load_session(weights, **session_kwargs)
+    session.warmup(tuple(infer_kwargs.get('imgsz', (640, 640))))
+    results.put(('ready', i, session.names, 0.0))
+    shms = {}
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        tid, slot, name, shape = task
+        t = time.time()
+        try:
+            im = np.ndarray(shape, dtype=np.uint8, buffer=_attach(shms, slot, name).buf)
+            det = session.infer(im, **infer_kwargs)[0].cpu().numpy()  # small (n,6) result, pickled back
+        except Exception as e:
+            det = e
+        results.put((tid, i, det, time.time() - t))
+    for shm in shms.values():
+        shm.close()
+
+
+class WorkerPool:
+    # N model replicas in separate processes sharing one task queue, frames passed through shared memory
+    # Usage:
+    #   pool = WorkerPool('best.pt', workers=4, threads=2, affinity=True, data='data/waste.yaml', conf_thres=0.25)
+    #   det = pool.submit(im0).result()  # (n,6) numpy [xyxy, conf, cls] in im0 pixels, as DetectorSession.infer()
+    #   dets = pool.infer([im0, im1])  # images spread over the workers
+    #   pool.close()
+    # A worker process exiting (OOM, crash) fails every outstanding future with a RuntimeError and breaks the pool,
+    # infer() raises TimeoutError after `timeout` seconds per image. Each worker runs torch.set_num_threads(threads)
+    # and, with affinity, is pinned to its own `threads` cores (Linux).
+    # Frames are copied once into one of `slots` shared memory blocks, only the detections come back through a queue
+    def __init__(self, weights, workers=2, threads=0, affinity=False, slots=0, device='cpu', half=False, dnn=False,
+                 data=None, timeout=60, **infer_kwargs):
+        workers = max(int(workers), 1)
+        cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count()))
+        threads = threads or max(len(cpus) // workers, 1)
+        if affinity and not hasattr(os, 'sched_setaffinity'):
+            LOGGER.warning('WARNING: CPU affinity is not supported on this platform, workers are not pinned')
+            affinity = False
+        session_kwargs = dict(device=device, half=half, dnn=dnn, **({'data': data} if data else {}))
+
+        ctx = mp.get_context('spawn')  # fresh interpreters, no forked torch thread pools
+        self.tasks, self.results = ctx.Queue(), ctx.Queue()
+        self.procs = []
+        for i in range(workers):
+            cores = cpus[i * threads % len(cpus):][:threads] if affinity else None
+            self.procs.append(ctx.Process(target=_work, daemon=True, args=(i, weights, session_kwargs, infer_kwargs,
+                                                                           threads, cores, self.tasks, self.results)))
+        for p in self.procs:
+            p.start()
+
+        self.threads, self.timeout = threads, timeout
+        self.broken = None  # RuntimeError once a worker exited
+        self.closing = False
+        self.shms = [None] * (slots or 2 * workers)  # shared memory blocks, grown on demand
+        self.free = list(range(len(self.shms)))
+        self.futures = {}  # {task id: (Future, slot)}
+        self.next_id = 0
+        self.busy = [0.0] * workers  # seconds spent inferring per worker
+        self.done = [0] * workers  # tasks per worker
+        self.names = None
+        self.cond = threading.Condition()
+        self.ready = 0
+        self.collector = threading.Thread(target=self._collect, daemon=True)
+        self.collector.start()
+        with self.cond:
+            self.cond.wait_for(lambda: self.ready == workers or not all(p.is_alive() for p in self.procs))
+        if self.ready < workers:
+            self.close()
+            raise RuntimeError('inference worker failed to start')
+        self.t_start = time.time()
+        LOGGER.info(f'Worker pool: {workers} processes x {threads} threads' + (', pinned' if affinity else ''))
+
+    def __len__(self):
+        return len(self.procs)
+
+    def submit(self, im):
+        # Queue BGR uint8 image im, returns a concurrent.futures.Future of its detections
+        im = np.ascontiguousarray(im)
+        with self.cond:
+            self.cond.wait_for(lambda: self.free or self.broken)  # bounded in-flight frames
+            if self.broken:
+                raise self.broken
+            slot = self.free.pop()
+            shm = self.shms[slot]
+            if shm is None or shm.size < im.nbytes:
+                if shm is not None:
+                    shm.close()
+                    shm.unlink()
+                shm = self.shms[slot] = shared_memory.SharedMemory(create=True, size=im.nbytes)
+            tid, self.next_id = self.next_id, self.next_id + 1
+            future = self.futures[tid] = Future(), slot
+        np.ndarray(im.shape, dtype=np.uint8, buffer=shm.buf)[:] = im
+        self.tasks.put((tid, slot, shm.name, im.shape))
+        return future[0]
+
+    def infer(self, ims):
+        # Detections for a list of images, in order
+        futures = [self.submit(im) for im in (ims if isinstance(ims, list) else [ims])]
+        return [f.result(self.timeout) for f in futures]
+
+    def stats(self):
+        wall = max(time.time() - self.t_start, 1E-9)
+        return {'workers': len(self), 'threads': self.threads, 'tasks': self.done,
+                'utilisation': [round(b / wall, 3) for b in self.busy]}
+
+    def __str__(self):
+        wall = max(time.time() - self.t_start, 1E-9)
+        return ', '.join(f'worker {i} {n} frames {b / wall:.0%} busy'
+                         for i, (n, b) in enumerate(zip(self.done, self.busy)))
+
+    def close(self):
+        self.closing = True  # workers exit normally from here
+        for _ in self.procs:
+            self.tasks.put(None)
+        for p in self.procs:
+            p.join(10)
+            if p.is_alive():
+                p.terminate()
+        self.collector.join()  # exits once the workers are gone, no sentinel: a killed worker may hold the queue lock
+        for shm in self.shms:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self.shms = []
+
+    def _collect(self):
+        # Result thread, resolves futures and frees their shared memory slots, watches the worker processes
+        while True:
+            try:
+                item = self.results.get(timeout=0.5)
+            except queue.Empty:  # idle, still check the workers below
+                if self.closing and not any(p.is_alive() for p in self.procs):
+                    break
+                item = ()
+            if item:
+                self._resolve(*item)
+            dead = [i for i, p in enumerate(self.procs) if not p.is_alive()]
+            if dead and not self.closing and not self.broken:
+                self._fail(dead[0])
+
+    def _resolve(self, tid, i, det, dt):
+        if tid == 'ready':
+            with self.cond:
+                self.ready += 1
+                self.names = det
+                self.cond.notify_all()
+            return
+        with self.cond:
+            future, slot = self.futures.pop(tid, (None, None))  # None if already failed by _fail()
+            if future is None:
+                return
+            self.free.append(slot)
+            self.busy[i] += dt
+            self.done[i] += 1
+            self.cond.notify_all()
+        if future.set_running_or_notify_cancel():  # False if the caller cancelled it, i.e. asyncio.wait_for() timeout
+            future.set_exception(det) if isinstance(det, Exception) else future.set_result(det)
+
+    def _fail(self, i):
+        # Worker i exited, its task is lost and tasks queued behind it may never run: fail all outstanding futures.
+        # Their slots are not reused as another worker may still be reading them
+        e = RuntimeError(f'inference worker {i} exited with code {self.procs[i].exitcode}')
+        LOGGER.warning(f'WARNING: {e}, worker pool stopped')
+        with self.cond:
+            self.broken = e
+            futures = [f for f, _ in self.futures.values()]
+            self.futures.clear()
+            self.cond.notify_all()
+        for f in futures:
+            if f.set_running_or_notify_cancel():
+                f.set_exception(e)